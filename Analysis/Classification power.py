@@ -1,68 +1,139 @@
-
-import math
-from math import comb, sqrt
+import numpy as np
 import pandas as pd
 import os
+import matplotlib.pyplot as plt
+from scipy.stats import binom, norm
 # This script performs a binomial power analysis for classification accuracy
 # It calculates the power of detecting a difference in classification accuracy
 # between a baseline (p0) and various scenarios (p1) using a binomial test.
 # It also computes the critical number of successes needed to reject the null hypothesis
 # and provides confidence intervals for the observed success rate.
+# All functions are vectorized (scipy.stats.binom in log space), so a whole grid of (p1, n, alpha) is evaluated at once,
+# and plan_sample_size finds the minimum n reaching a target power for each modality/model in the PE_Stats files.
 def cohen_h(p1, p0):
-    p1 = min(max(p1, 1e-12), 1 - 1e-12)
-    p0 = min(max(p0, 1e-12), 1 - 1e-12)
-    return 2 * math.asin(math.sqrt(p1)) - 2 * math.asin(math.sqrt(p0))
+    p1 = np.clip(p1, 1e-12, 1 - 1e-12)
+    p0 = np.clip(p0, 1e-12, 1 - 1e-12)
+    return 2 * np.arcsin(np.sqrt(p1)) - 2 * np.arcsin(np.sqrt(p0))
 
 def binom_pmf(n, k, p):
-    return comb(n, k) * (p**k) * ((1-p)**(n-k))
+    return binom.pmf(k, n, p)
 
 def binom_sf(n, k, p):
-    return sum(binom_pmf(n, i, p) for i in range(k, n+1))
+    # P(X >= k)
+    return np.exp(binom.logsf(np.asarray(k) - 1, n, p))
 
 def binomial_test_pvalue(k, n, p0):
     return binom_sf(n, k, p0)
 
 def find_critical_k(n, p0, alpha):
-    for k in range(0, n+1):
-        if binom_sf(n, k, p0) <= alpha:
-            return k
-    return n+1
+    # Smallest k with P(X >= k) <= alpha under p0 (n+1 when no k qualifies)
+    n, p0, alpha = np.broadcast_arrays(np.asarray(n), np.asarray(p0, dtype=float), np.asarray(alpha, dtype=float))
+    k = binom.isf(alpha, n, p0).astype(int) + 1
+    # isf works on floating point tail sums; settle the exact boundary in log space
+    log_alpha = np.log(alpha)
+    k = np.where(binom.logsf(k - 2, n, p0) <= log_alpha, k - 1, k)
+    k = np.where(binom.logsf(k - 1, n, p0) > log_alpha, k + 1, k)
+    k = np.minimum(k, n + 1)
+    return k if k.ndim else int(k)
 
 def power_binomial(p1, p0, n, alpha=0.05):
     kcrit = find_critical_k(n, p0, alpha)
-    if kcrit > n:
-        return 0.0, kcrit
-    power = binom_sf(n, kcrit, p1)
-    return power, kcrit
+    power = np.where(np.asarray(kcrit) > np.asarray(n), 0.0, binom_sf(n, kcrit, p1))
+    return (power if power.ndim else float(power)), kcrit
 
 def wilson_ci(k, n, alpha=0.05):
-    z = 1.96
-    phat = k / n
+    z = norm.ppf(1 - np.asarray(alpha) / 2)
+    phat = np.asarray(k) / n
     denom = 1 + z*z/n
     centre = phat + z*z/(2*n)
-    margin = z * math.sqrt((phat*(1-phat) + z*z/(4*n)) / n)
-    lower = (centre - margin) / denom
-    upper = (centre + margin) / denom
-    return max(0.0, lower), min(1.0, upper)
+    margin = z * np.sqrt((phat*(1-phat) + z*z/(4*n)) / n)
+    lower = np.maximum(0.0, (centre - margin) / denom)
+    upper = np.minimum(1.0, (centre + margin) / denom)
+    return (lower, upper) if lower.ndim else (float(lower), float(upper))
+
+def power_grid(p1, n, alpha, p0=1/3):
+    # Critical k, power, p-value and Wilson CI for every combination of p1, n and alpha
+    P1, N, A = (g.ravel() for g in np.meshgrid(np.asarray(p1, dtype=float), np.asarray(n), np.asarray(alpha, dtype=float), indexing='ij'))
+    power, kcrit = power_binomial(P1, p0, N, A)
+    k_obs = np.round(P1 * N).astype(int)
+    ci_lower, ci_upper = wilson_ci(k_obs, N, A)
+    return pd.DataFrame({'p1': P1, 'n': N, 'Alpha': A, 'Cohen_h': cohen_h(P1, p0),
+                         'p-value': binomial_test_pvalue(k_obs, N, p0), 'Power': power, 'Critical_k': kcrit,
+                         'CI_Lower': ci_lower, 'CI_Upper': ci_upper})
+
+def plan_sample_size(p1, p0=1/3, alpha=0.05, target_power=0.8, n_max=1000):
+    # Minimum n reaching the target power; exact binomial power saw-tooths in n, so n_stable is the
+    # smallest n from which the power stays at or above the target up to n_max
+    p1 = np.atleast_1d(np.asarray(p1, dtype=float))
+    ns = np.arange(1, n_max + 1)
+    power, _ = power_binomial(p1[:, None], p0, ns[None, :], alpha)
+    reached = power >= target_power
+    any_reached = reached.any(axis=1)
+    min_n = np.where(any_reached, ns[reached.argmax(axis=1)], -1)
+    # last n below the target, scanning from n_max backwards
+    below_from_end = (~reached)[:, ::-1]
+    n_stable = np.where(below_from_end.any(axis=1), n_max - below_from_end.argmax(axis=1) + 1, 1)
+    n_stable = np.where(reached[:, -1], n_stable, -1)
+    return pd.DataFrame({'p1': p1, 'Alpha': alpha, 'Target_Power': target_power, 'min_n': min_n, 'n_stable': n_stable})
+
+def plot_power_curves(p1, labels, p0=1/3, alpha=0.05, target_power=0.8, n_max=100):
+    # Exact power against the number of classified items, one curve per observed accuracy
+    ns = np.arange(1, n_max + 1)
+    power, _ = power_binomial(np.asarray(p1, dtype=float)[:, None], p0, ns[None, :], alpha)
+    fig, ax = plt.subplots(figsize=(8, 5))
+    for curve, label in zip(power, labels):
+        ax.step(ns, curve, where='post', label=label)
+    ax.axhline(target_power, color='black', linestyle='--', linewidth=1, label=f'Target power = {target_power}')
+    ax.set_xlabel('Number of classified items (n)')
+    ax.set_ylabel('Power')
+    ax.set_ylim(0, 1.02)
+    ax.set_title(f'Binomial power vs chance (p0 = {p0:.2f}, alpha = {alpha:.4g})')
+    ax.legend(fontsize=8)
+    fig.tight_layout()
+    return fig
 
-# parameters from classification accuracy in sequence
-p0 = 1/3
-p1 = [0.96,0.92,0.86,0.64,0.84,0.64,0.91,0.88]
-n = 300
-alpha = 0.05
+def classification_accuracies(input_dir):
+    # Accuracy of every modality/model (and image tool), from the same loader as the confusion matrices
+    from classification_metrics import load_predictions
+    df = load_predictions(input_dir)
+    df['correct'] = df['truth'] == df['prediction']
+    accuracies = df.groupby(['model', 'modality', 'tool']).agg(n_observed=('correct', 'size'), Accuracy=('correct', 'mean')).reset_index()
+    return accuracies.rename(columns={'model': 'Model', 'modality': 'Modality', 'tool': 'Image_Tool'})
 
-# Calculations
-results = []
-for i in range(len(p1)):
+def bonferroni_alpha(accuracies, family_alpha=0.05):
+    # Per-comparison alpha, Bonferroni over the modality/model (and image tool) comparisons in accuracies
+    return family_alpha / max(len(accuracies), 1)
 
-    h = f"{cohen_h(p1[i], p0):.2f}"
+if __name__ == "__main__":
+    # parameters from classification accuracy in sequence
+    p0 = 1/3
+    p1 = [0.96,0.92,0.86,0.64,0.84,0.64,0.91,0.88]
+    n = 300
+    alpha = 0.05
 
-    k_obs = int(round(p1[i] * n))
-    pval = f"{binomial_test_pvalue(k_obs, n, p0):.2e}"
-    power, kcrit = power_binomial(p1[i], p0, n, alpha)
-    ci_lower, ci_upper = wilson_ci(k_obs, n, alpha=alpha)
-    results.append([i,n,p1[i],h,pval,alpha,power,kcrit,f"{ci_lower:.2f}",f"{ci_upper:.2f}" ])
+    # Calculations
+    grid = power_grid(p1, n, alpha, p0)
+    df_results = pd.DataFrame({
+        'Scenario': range(len(p1)),
+        'n': grid['n'],
+        'p1': grid['p1'],
+        'Cohen_h': grid['Cohen_h'].map(lambda h: f"{h:.2f}"),
+        'p-value': grid['p-value'].map(lambda p: f"{p:.2e}"),
+        'Alpha': grid['Alpha'],
+        'Power': grid['Power'],
+        'Critical_k': grid['Critical_k'],
+        'CI_Lower': grid['CI_Lower'].map(lambda c: f"{c:.2f}"),
+        'CI_Upper': grid['CI_Upper'].map(lambda c: f"{c:.2f}"),
+    })
+    df_results.to_csv(os.path.join(os.getcwd(),"StatsResults","binomial_analysis_results.csv"), index=False)
+    print(df_results)
 
-df_results = pd.DataFrame(results, columns=['Scenario', 'n', 'p1', 'Cohen_h', 'p-value', 'Alpha', 'Power', 'Critical_k', 'CI_Lower', 'CI_Upper'])
-df_results.to_csv(os.path.join(os.getcwd(),"StatsResults","binomial_analysis_results.csv"), index=False)
-print(df_results)
\ No newline at end of file
+    # Sample-size plan: minimum number of classified items per modality/model to reach the target power
+    target_power = 0.8 #change this to the power you want to reach
+    accuracies = classification_accuracies(os.path.join(os.getcwd(),"StatsResults"))
+    if not accuracies.empty:
+        plan = plan_sample_size(accuracies['Accuracy'], p0, bonferroni_alpha(accuracies), target_power)
+        for column in ['Alpha', 'Target_Power', 'min_n', 'n_stable']:
+            accuracies[column] = plan[column].to_numpy()
+        accuracies.to_csv(os.path.join(os.getcwd(),"StatsResults","binomial_sample_size_plan.csv"), index=False)
+        print(accuracies)
@@ -4,10 +4,12 @@ from scipy import stats
 import matplotlib.pyplot as plt
 from pathlib import Path
 import os
+from resampling import paired_summary
 
 # this script compares the performance of DALL·E 3 and GPT-4o in generating images
 # it calculates the mean and confidence intervals for alignment and aesthetics scores
 # and performs statistical tests to determine if one model is significantly better than the other
+# paired ratings also get bootstrap CIs and sign-flip permutation p-values from resampling.py
 
 input_dir = os.path.join(os.getcwd(),"StatsResults")
 
@@ -114,11 +116,9 @@ def plot_paired_differences_combined(gpt_align, dalle_align, gpt_aesth, dalle_ae
     plt.savefig(out_path, dpi=150)
     plt.close(fig)
 
-# -----------------------------
-# Main
-# -----------------------------
-if __name__ == "__main__":
-    df = pd.read_csv(CSV_IN).rename(columns={"type": "model"})
+def load_ratings(csv_in=CSV_IN):
+    # Average alignment and aesthetics ratings of the GPT-4o and the DALL·E 3 images
+    df = pd.read_csv(csv_in).rename(columns={"type": "model"})
     df.columns = [c.strip() for c in df.columns]
     tidy = df[["model", "AVG Alignment", "AVG Aesthetics"]].rename(
         columns={"AVG Alignment": "alignment", "AVG Aesthetics": "aesthetics"}
@@ -126,6 +126,23 @@ if __name__ == "__main__":
     tidy["model"] = tidy["model"].apply(normalize_model_name)
     gpt = tidy[tidy["model"] == "GPT-4o"].reset_index(drop=True)
     dalle = tidy[tidy["model"] == "DALL·E 3"].reset_index(drop=True)
+    return gpt, dalle
+
+def plot_all(gpt, dalle):
+    plot_model_means_with_ci(gpt["alignment"], dalle["alignment"], "alignment", PLOT_ALIGN_MEAN)
+    plot_model_means_with_ci(gpt["aesthetics"], dalle["aesthetics"], "aesthetics", PLOT_AESTH_MEAN)
+    plot_paired_differences(gpt["alignment"], dalle["alignment"], "alignment", PLOT_ALIGN_DIFF)
+    plot_paired_differences(gpt["aesthetics"], dalle["aesthetics"], "aesthetics", PLOT_AESTH_DIFF)
+    plot_paired_differences_combined(
+        gpt["alignment"], dalle["alignment"], gpt["aesthetics"], dalle["aesthetics"], PLOT_DIFF_COMBINED
+    )
+    return [PLOT_ALIGN_MEAN, PLOT_AESTH_MEAN, PLOT_ALIGN_DIFF, PLOT_AESTH_DIFF, PLOT_DIFF_COMBINED]
+
+# -----------------------------
+# Main
+# -----------------------------
+if __name__ == "__main__":
+    gpt, dalle = load_ratings(CSV_IN)
     rows = []
     for metric in ["alignment", "aesthetics"]:
         x = gpt[metric].to_numpy(float)
@@ -170,13 +187,21 @@ if __name__ == "__main__":
                 "mean_diff": float(np.mean(diffs)),
                 "n_pairs": int(len(diffs)),
             })
+        # Bootstrap CIs and paired permutation p-values for both metrics at once
+        diffs = gpt[["alignment", "aesthetics"]] - dalle[["alignment", "aesthetics"]]
+        for r in paired_summary(diffs).to_dict("records"):
+            rows.append({
+                "metric": r["metric"],
+                "design": "Paired bootstrap CI + sign-flip permutation test (one-sided)",
+                "alt_hypothesis": "mean(GPT-4o - DALL·E 3) > 0",
+                "p_value": float(r["p_value"]),
+                "mean_diff": float(r["mean_diff"]),
+                "ci_low": float(r["mean_diff LB"]),
+                "ci_high": float(r["mean_diff UB"]),
+                "win_prob": float(r["win_prob"]),
+                "n_pairs": int(r["n_pairs"]),
+            })
     results = pd.DataFrame(rows)
     results.to_csv(CSV_OUT, index=False)
     print(f"Saved results to: {CSV_OUT}")
-    plot_model_means_with_ci(gpt["alignment"], dalle["alignment"], "alignment", PLOT_ALIGN_MEAN)
-    plot_model_means_with_ci(gpt["aesthetics"], dalle["aesthetics"], "aesthetics", PLOT_AESTH_MEAN)
-    plot_paired_differences(gpt["alignment"], dalle["alignment"], "alignment", PLOT_ALIGN_DIFF)
-    plot_paired_differences(gpt["aesthetics"], dalle["aesthetics"], "aesthetics", PLOT_AESTH_DIFF)
-    plot_paired_differences_combined(
-        gpt["alignment"], dalle["alignment"], gpt["aesthetics"], dalle["aesthetics"], PLOT_DIFF_COMBINED
-    )
+    plot_all(gpt, dalle)
@@ -0,0 +1,120 @@
+import os
+import itertools
+import numpy as np
+import pandas as pd
+from resampling import B_DEFAULT, bootstrap_indices, resample_weights
+
+# Agreement between classification models
+# The predictions of every model are joined on the item key (problem_size, scenario, tool, modality) instead of
+# being paired by row position, into one (items x models) matrix of category codes. From that matrix:
+#   raw agreement and Cohen's kappa for every pair of models, Fleiss' kappa for all models together,
+# overall per modality and per stratum (problem size, tool), with percentile bootstrap CIs over the items.
+# Every statistic is a function of cell counts, so the B resamples are one (B x n) weight matrix times a
+# one-hot matrix of the items (resampling.py): no loop over resamples and no pairwise merges of the files.
+# Items a model did not classify are left out of the comparisons involving that model.
+# Run this file from the repository root; it writes StatsResults/classification_agreement.csv.
+
+KEY = ["problem_size", "scenario", "tool", "modality"]
+STRATA = [["modality"], ["modality", "problem_size"], ["modality", "tool"]]
+STRATUM_COLUMNS = ["modality", "problem_size", "tool"]
+
+
+def rating_matrix(df: pd.DataFrame, key: list = KEY, rater: str = "model", rating: str = "prediction"):
+    """(items, raters, categories, codes): codes[i, r] = category index of item i rated by rater r, -1 if missing"""
+    duplicated = df.duplicated(key + [rater])
+    if duplicated.any():
+        raise ValueError(f"{duplicated.sum()} items are rated more than once by the same {rater}")
+    items = df[key].drop_duplicates().sort_values(key).reset_index(drop=True)
+    raters = sorted(df[rater].unique())
+    categories = sorted(df[rating].unique())
+    row = pd.MultiIndex.from_frame(items).get_indexer(pd.MultiIndex.from_frame(df[key]))
+    codes = np.full((len(items), len(raters)), -1)
+    codes[row, pd.Index(raters).get_indexer(df[rater])] = pd.Index(categories).get_indexer(df[rating])
+    return items, raters, categories, codes
+
+
+def cohen_kappa(a: np.ndarray, b: np.ndarray, k: int, weights: np.ndarray = None):
+    """(kappa, agreement) of two code vectors over k categories; with (B x n) weights, one value per resample"""
+    onehot = np.eye(k * k)[a * k + b]
+    tables = (onehot.sum(axis=0, keepdims=True) if weights is None else weights @ onehot).reshape(-1, k, k)
+    n = tables.sum(axis=(1, 2))
+    agreement = np.trace(tables, axis1=1, axis2=2) / n
+    expected = (tables.sum(axis=2) * tables.sum(axis=1)).sum(axis=1) / n**2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kappa = (agreement - expected) / (1 - expected)
+    return kappa, agreement
+
+
+def fleiss_kappa(codes: np.ndarray, k: int, weights: np.ndarray = None) -> np.ndarray:
+    """Fleiss' kappa of an (n x m) code matrix (every item rated by all m raters); with (B x n) weights, per resample"""
+    n, m = codes.shape
+    counts = np.bincount((np.arange(n)[:, None] * k + codes).ravel(), minlength=n * k).reshape(n, k)
+    item_agreement = ((counts**2).sum(axis=1) - m) / (m * (m - 1))
+    weights = np.ones((1, n)) if weights is None else weights
+    total = weights.sum(axis=1)
+    mean_agreement = weights @ item_agreement / total
+    shares = weights @ counts / (total[:, None] * m)
+    expected = (shares**2).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (mean_agreement - expected) / (1 - expected)
+
+
+def percentile_ci(estimate: float, replicates: np.ndarray, alpha: float):
+    # Resamples with a single category have no kappa; leave them out of the interval
+    replicates = replicates[~np.isnan(replicates)]
+    if np.isnan(estimate) or not len(replicates):
+        return np.nan, np.nan
+    return tuple(np.quantile(replicates, [alpha / 2, 1 - alpha / 2]))
+
+
+def stratum_agreement(codes: np.ndarray, raters: list, k: int, B: int = B_DEFAULT, alpha: float = 0.05, seed=0) -> list:
+    """Rows of agreement statistics of one stratum of items"""
+    rows = []
+
+    def add(names, statistic, n, estimate, replicates):
+        lower, upper = percentile_ci(estimate, replicates, alpha)
+        rows.append({"raters": names, "statistic": statistic, "n_items": n,
+                     "estimate": estimate, "LB": lower, "UB": upper})
+
+    for a, b in itertools.combinations(range(len(raters)), 2):
+        pair = codes[(codes[:, a] >= 0) & (codes[:, b] >= 0)][:, [a, b]]
+        if not len(pair):
+            continue
+        weights = resample_weights(bootstrap_indices(len(pair), B, seed))
+        kappa, agreement = cohen_kappa(pair[:, 0], pair[:, 1], k)
+        kappa_b, agreement_b = cohen_kappa(pair[:, 0], pair[:, 1], k, weights)
+        names = f"{raters[a]} vs {raters[b]}"
+        add(names, "agreement", len(pair), agreement[0], agreement_b)
+        add(names, "cohen_kappa", len(pair), kappa[0], kappa_b)
+    complete = codes[(codes >= 0).all(axis=1)]
+    if len(raters) > 1 and len(complete):
+        weights = resample_weights(bootstrap_indices(len(complete), B, seed))
+        add("+".join(raters), "fleiss_kappa", len(complete), fleiss_kappa(complete, k)[0], fleiss_kappa(complete, k, weights))
+    return rows
+
+
+def agreement_table(df: pd.DataFrame, strata: list = STRATA, B: int = B_DEFAULT, alpha: float = 0.05, seed=0) -> pd.DataFrame:
+    """Agreement statistics of every stratum; columns not stratified on are 'all'"""
+    items, raters, categories, codes = rating_matrix(df)
+    rows = []
+    for by in strata:
+        for values, index in items.groupby(by).indices.items():
+            values = values if isinstance(values, tuple) else (values,)
+            stratum = {column: "all" for column in STRATUM_COLUMNS} | dict(zip(by, values))
+            for row in stratum_agreement(codes[index], raters, len(categories), B, alpha, seed):
+                rows.append(stratum | row)
+    return pd.DataFrame(rows, columns=STRATUM_COLUMNS + ["raters", "statistic", "n_items", "estimate", "LB", "UB"])
+
+
+def main():
+    from classification_metrics import load_predictions
+    input_dir = os.path.join(os.getcwd(), "StatsResults")
+    table = agreement_table(load_predictions(input_dir))
+    output_file = os.path.join(input_dir, "classification_agreement.csv")
+    table.to_csv(output_file, index=False)
+    print(table.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"Saved to: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import re
+import glob
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from sklearn.metrics import ConfusionMatrixDisplay
+
+# Classification metrics engine
+# Loads every StatsResults/PE_Stats_summary_{problem}_combined_{model}_classify_{modality}.csv once and builds
+# the confusion matrices of all (model, modality, tool) slices with a single bincount, then derives per-label
+# (problem size) precision, recall and F1 from the matrices. The ConfusionMatrix_* scripts show slices of it;
+# running this file writes the combined report for every slice:
+#   StatsResults/classification_metrics_report.csv      precision/recall/F1/support per slice and label
+#   StatsResults/classification_confusion_matrices.csv  confusion matrix counts per slice
+# The predictions are read from the Parquet warehouse (results_warehouse.py) when it is up to date, otherwise from the CSVs.
+# Precision, recall and F1 match sklearn's per-label scores: predictions outside the labels (e.g. "Error")
+# count against recall but are not shown in the confusion matrix.
+
+LABELS = ["glitch", "bummer", "disaster"]
+MODEL_NAMES = {"cgpt": "ChatGPT", "gemini": "Gemini"}
+MODALITY_NAMES = {"text": "Text", "image": "Images", "video": "Videos"}
+FILE_PATTERN = re.compile(r"PE_Stats_summary_(\w+?)_combined_(\w+?)_classify_(\w+)\.csv$")
+SLICE = ["model", "modality", "tool"]
+
+
+def load_predictions(input_dir: str) -> pd.DataFrame:
+    """Truth and prediction of every classified item, tagged with problem size, scenario, model, modality and tool"""
+    columns = ["problem_size", "model", "modality", "tool", "truth", "prediction"]
+    try:
+        from results_warehouse import is_current, read_table
+        root = os.path.dirname(os.path.abspath(input_dir))
+        if is_current("classification", root):
+            df = read_table("classification", columns=columns + ["scenario"], warehouse_dir=os.path.join(input_dir, "warehouse"))
+            df = df.astype({c: object for c in columns}).fillna({"tool": "", "prediction": ""})
+            return df.astype({"scenario": int})
+    except ImportError:
+        pass
+    dfs = []
+    for path in sorted(glob.glob(os.path.join(input_dir, "PE_Stats_summary_*_combined_*_classify_*.csv"))):
+        match = FILE_PATTERN.search(os.path.basename(path))
+        if not match:
+            continue
+        problem_size, model, modality = match.groups()
+        header = pd.read_csv(path, nrows=0).columns
+        columns = ["scenario", "Problem Size", "Predicted Problem Size"] + (["Image_Tool"] if "Image_Tool" in header else [])
+        df = pd.read_csv(path, usecols=columns, dtype=str)
+        dfs.append(pd.DataFrame({
+            "problem_size": problem_size, "model": model, "modality": modality,
+            "scenario": df["scenario"].astype(int),
+            "tool": df["Image_Tool"].fillna("") if "Image_Tool" in df.columns else "",
+            "truth": df["Problem Size"].str.strip().str.lower(),
+            "prediction": df["Predicted Problem Size"].fillna("").str.strip().str.lower(),
+        }))
+    if not dfs:
+        raise FileNotFoundError(f"No PE_Stats_summary_*_classify_*.csv files found in {input_dir}")
+    return pd.concat(dfs, ignore_index=True)
+
+
+def confusion_matrices(df: pd.DataFrame, by: list = SLICE, labels: list = LABELS):
+    """(slices, counts): counts[g, i, j] = items of slice g with truth labels[i] and prediction labels[j];
+    the extra last column counts predictions outside the labels"""
+    k = len(labels)
+    codes = {label: i for i, label in enumerate(labels)}
+    df = df[df["truth"].isin(labels)]
+    slices = df[by].drop_duplicates().sort_values(by).reset_index(drop=True)
+    group = pd.MultiIndex.from_frame(slices).get_indexer(pd.MultiIndex.from_frame(df[by]))
+    truth = df["truth"].map(codes).to_numpy()
+    prediction = df["prediction"].map(codes).fillna(k).astype(int).to_numpy()
+    # One pass over every row of every slice
+    flat = (group * k + truth) * (k + 1) + prediction
+    counts = np.bincount(flat, minlength=len(slices) * k * (k + 1)).reshape(len(slices), k, k + 1)
+    return slices, counts
+
+
+def scores(counts: np.ndarray) -> dict:
+    """Per-slice, per-label precision, recall, F1 and support from confusion counts"""
+    k = counts.shape[1]
+    tp = counts[:, np.arange(k), np.arange(k)].astype(float)
+    predicted = counts[:, :, :k].sum(axis=1)
+    support = counts.sum(axis=2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+        accuracy = tp.sum(axis=1) / support.sum(axis=1)
+    return {"precision": precision, "recall": recall, "f1": f1, "support": support, "accuracy": accuracy}
+
+
+def metrics_report(slices: pd.DataFrame, counts: np.ndarray, labels: list = LABELS) -> pd.DataFrame:
+    """Long table: one row per slice and label"""
+    s = scores(counts)
+    n, k = len(slices), len(labels)
+    report = slices.loc[slices.index.repeat(k)].reset_index(drop=True)
+    report["label"] = labels * n
+    for name in ["precision", "recall", "f1", "support"]:
+        report[name] = s[name].ravel()
+    report["accuracy"] = np.repeat(s["accuracy"], k)
+    return report
+
+
+def matrix_table(slices: pd.DataFrame, counts: np.ndarray, labels: list = LABELS) -> pd.DataFrame:
+    """Long table of the confusion counts, including predictions outside the labels"""
+    n, k = len(slices), len(labels)
+    table = slices.loc[slices.index.repeat(k * (k + 1))].reset_index(drop=True)
+    table["true"] = np.tile(np.repeat(labels, k + 1), n)
+    table["predicted"] = np.tile(labels + ["other"], n * k)
+    table["count"] = counts.ravel()
+    return table
+
+
+def plot_confusion_matrix(cm: np.ndarray, title: str):
+    """Row-normalized (%) confusion matrix; returns the percentages"""
+    # Normalize by row (true labels) to get percentages
+    cm_percentage = cm.astype('float') / cm.sum(axis=1, keepdims=True) * 100
+
+    # Plot normalized confusion matrix (with numbers, no % sign)
+    disp = ConfusionMatrixDisplay(confusion_matrix=cm_percentage, display_labels=["Glitch", "Bummer", "Disaster"])
+    fig, ax = plt.subplots()
+    disp.plot(cmap='Blues', values_format=".2f", ax=ax)
+
+    # Set color scale limits manually
+    im = ax.images[0]  # Access the image object created by ConfusionMatrixDisplay
+    im.set_clim(0, 100)  # Set vmin=0 and vmax=100
+    plt.title(title)
+    return cm_percentage
+
+
+def slice_title(model: str, modality: str, tool: str) -> str:
+    subject = f"{tool} {MODALITY_NAMES[modality]}" if tool else MODALITY_NAMES[modality]
+    return f"Confusion Matrix of {subject} Classified by {MODEL_NAMES.get(model, model)} (%)"
+
+
+def show_confusion_matrices(model: str, modality: str, input_dir: str = None, tools: list = ['GPTimage', 'DallE3']):
+    """Print the metrics and show the confusion matrix of every tool slice of one model and modality"""
+    input_dir = input_dir or os.path.join(os.getcwd(), "StatsResults")
+    df = load_predictions(input_dir)
+    df = df[(df["model"] == model) & (df["modality"] == modality)]
+    slices, counts = confusion_matrices(df)
+    s = scores(counts)
+    order = sorted(range(len(slices)), key=lambda g: tools.index(slices["tool"][g]) if slices["tool"][g] in tools else -1)
+    for g in order:
+        tool = slices["tool"][g]
+        # Calculate precision, recall, and F1 score
+        for i, label in enumerate(LABELS):
+            print(f"Metrics for {label}:")
+            print(f"  Precision: {s['precision'][g, i]:.2f}")
+            print(f"  Recall: {s['recall'][g, i]:.2f}")
+            print(f"  F1 Score: {s['f1'][g, i]:.2f}")
+        title = slice_title(model, modality, tool)
+        cm_percentage = plot_confusion_matrix(counts[g, :, :len(LABELS)], title)
+        plt.show()
+
+        # Print matrix with percentage signs
+        cm_percentage_with_sign = np.array([[f"{value:.2f}%" for value in row] for row in cm_percentage])
+        print(f"{title} with Percentage Signs:")
+        print(cm_percentage_with_sign)
+
+
+def main():
+    input_dir = os.path.join(os.getcwd(), "StatsResults")
+    df = load_predictions(input_dir)
+    # Every tool separately, plus all tools of a model and modality together
+    pooled = df.assign(tool="all")
+    slices, counts = confusion_matrices(pd.concat([df, pooled[pooled["modality"] != "text"]], ignore_index=True))
+    report = metrics_report(slices, counts)
+    report.to_csv(os.path.join(input_dir, "classification_metrics_report.csv"), index=False)
+    matrix_table(slices, counts).to_csv(os.path.join(input_dir, "classification_confusion_matrices.csv"), index=False)
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    print(f"Report saved to: {os.path.join(input_dir, 'classification_metrics_report.csv')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import os
+import glob
+import hashlib
+import sqlite3
+import pandas as pd
+from image_features import FEATURES, EXTRACTOR_VERSION, IMAGE_TYPES, extract_paths
+
+# Persistent image feature store
+# Image features are stored in SQLite (StatsResults/image_features.sqlite) keyed by the sha256 of the PNG content
+# and the feature-extractor version, next to the problem size, scenario and tool of every image file.
+# update() only hashes files whose size or modification time changed and only scores content that has no
+# features for the current extractor version yet, so new images from the generator are scored incrementally
+# and Quant_ImageAnalysis becomes a query over stored features.
+# Run this file from the repository root to score every new image in the Bummer/Glitch/Disaster folders.
+
+STORE_FILE = "image_features.sqlite"
+PROBLEM_SIZES = ['bummer', 'glitch', 'disaster']
+
+
+def default_store_path() -> str:
+    return os.path.join(os.getcwd(), "StatsResults", STORE_FILE)
+
+
+def extractor_version(levels: int = 0) -> str:
+    """Version key of the features; approximate (pyramid) scores are stored separately"""
+    return f"{EXTRACTOR_VERSION}-L{levels}"
+
+
+def content_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def folder_images(root: str = None) -> list:
+    """(problem_size, scenario, tool, path) of every scenario image in the problem-size folders"""
+    root = root or os.getcwd()
+    images = []
+    for problem_size in PROBLEM_SIZES:
+        for path in glob.glob(os.path.join(root, f"{problem_size.capitalize()}Folder", f"scenario_{problem_size}_*_*.png")):
+            parts = os.path.splitext(os.path.basename(path))[0].split("_")
+            if len(parts) == 4 and parts[2].isdigit() and parts[3] in IMAGE_TYPES:
+                images.append((problem_size, int(parts[2]), parts[3], path))
+    return sorted(images)
+
+
+class FeatureStore:
+    """Image features keyed by (content hash, extractor version)"""
+
+    def __init__(self, path: str = None):
+        self.path = path or default_store_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        columns = ", ".join(f'"{name}" REAL' for name in FEATURES)
+        self.db.executescript(f"""
+            CREATE TABLE IF NOT EXISTS features (
+                content_hash TEXT, extractor_version TEXT, {columns},
+                PRIMARY KEY (content_hash, extractor_version));
+            CREATE TABLE IF NOT EXISTS images (
+                path TEXT PRIMARY KEY, problem_size TEXT, scenario INTEGER, tool TEXT,
+                content_hash TEXT, size INTEGER, mtime REAL);
+            CREATE INDEX IF NOT EXISTS images_key ON images (problem_size, scenario, tool);
+        """)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def register(self, images: list) -> list:
+        """Record the images and their content hashes; only rehash files whose size or mtime changed"""
+        known = {row[0]: row[1:] for row in self.db.execute("SELECT path, content_hash, size, mtime FROM images")}
+        rows = []
+        for problem_size, scenario, tool, path in images:
+            path = os.path.abspath(path)
+            stat = os.stat(path)
+            cached = known.get(path)
+            if cached and cached[1] == stat.st_size and cached[2] == stat.st_mtime:
+                h = cached[0]
+            else:
+                h = content_hash(path)
+            rows.append((path, problem_size, int(scenario), tool, h, stat.st_size, stat.st_mtime))
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return rows
+
+    def update(self, images: list, workers: int = None, levels: int = 0, pack_dir: str = None) -> int:
+        """Score the images whose content has no features for this extractor version; returns the number scored.
+        pack_dir reads the pixels from a packed image dataset (image_pack.py) instead of decoding the PNGs."""
+        version = extractor_version(levels)
+        rows = self.register(images)
+        done = {row[0] for row in self.db.execute(
+            "SELECT content_hash FROM features WHERE extractor_version = ?", (version,))}
+        # Identical content is scored once, whatever the number of files holding it
+        todo = {}
+        for path, _, _, _, h, _, _ in rows:
+            if h not in done and h not in todo:
+                todo[h] = path
+        if not todo:
+            return 0
+        records = extract_paths(list(todo.values()), workers=workers, levels=levels, pack_dir=pack_dir)
+        placeholders = ", ".join("?" * (len(FEATURES) + 2))
+        with self.db:
+            self.db.executemany(f"INSERT OR REPLACE INTO features VALUES ({placeholders})",
+                                [(h, version, *record) for h, record in zip(todo, records.tolist())])
+        return len(todo)
+
+    def query(self, problem_sizes: list = None, N: int = None, levels: int = 0) -> pd.DataFrame:
+        """Stored features as problem_size, Scenario, Image Type and one column per feature"""
+        columns = ", ".join(f'f."{name}"' for name in FEATURES)
+        sql = (f"SELECT i.problem_size, i.scenario, i.tool, {columns} FROM images i "
+               "JOIN features f ON f.content_hash = i.content_hash AND f.extractor_version = ?")
+        params = [extractor_version(levels)]
+        where = []
+        if problem_sizes:
+            where.append(f"i.problem_size IN ({', '.join('?' * len(problem_sizes))})")
+            params += list(problem_sizes)
+        if N is not None:
+            where.append("i.scenario <= ?")
+            params.append(int(N))
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY i.problem_size, i.scenario, i.tool"
+        df = pd.read_sql_query(sql, self.db, params=params)
+        df.columns = ['problem_size', 'Scenario', 'Image Type'] + FEATURES
+        return df.drop_duplicates(subset=['problem_size', 'Scenario', 'Image Type'], keep='last').reset_index(drop=True)
+
+
+def main():
+    store = FeatureStore()
+    images = folder_images()
+    scored = store.update(images)
+    print(f"{len(images)} images, {scored} newly scored, store: {store.path}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import os
+import time
+import numpy as np
+import cv2 as cv
+from concurrent.futures import ProcessPoolExecutor
+from skimage.measure import shannon_entropy
+
+# Image feature extraction for the quantitative image analysis
+# Every image is scored on sharpness, contrast, entropy, resolution and BRISQUE. The work per image is
+# independent CPU work, so extract_paths can spread it over a process pool: the paths are split into
+# chunks, each worker returns one compact NumPy record array per chunk, and the chunks are put back
+# together in input order, so the result does not depend on the number of workers.
+# The BRISQUE model and range files are parsed once per process (BrisqueScorer) instead of once per image.
+# The other metrics come from MetricKernel, which shares one grayscale image and one histogram between them and
+# computes the gradients in float32 into buffers reused from image to image; image_metrics is the float64
+# reference it is checked against. MetricKernel(levels=k) scores a k-times pyrDown'ed image for fast approximate
+# scoring; sharpness and resolution depend on scale, so only compare scores computed with the same levels.
+# Run this file from the repository root to benchmark BRISQUE and the metric kernel before and after.
+
+FEATURES = ['Sharpness', 'Contrast', 'Entropy', 'Resolution', 'BRISQUE']
+RECORD_DTYPE = np.dtype([(name, 'f8') for name in FEATURES])
+# Bump when a metric changes so stored features (feature_store.py) are recomputed
+EXTRACTOR_VERSION = "1"
+BRISQUE_MODEL = "brisque_model_live.yml"
+BRISQUE_RANGE = "brisque_range_live.yml"
+IMAGE_TYPES = ['DallE3', 'GPTimage']
+
+
+class BrisqueScorer:
+    """BRISQUE model and range loaded once and reused for every image"""
+
+    def __init__(self, model_file: str = BRISQUE_MODEL, range_file: str = BRISQUE_RANGE):
+        self.quality = cv.quality.QualityBRISQUE_create(model_file, range_file)
+
+    def score(self, img) -> float:
+        return self.quality.compute(img)[0]
+
+    def score_batch(self, imgs: list) -> np.ndarray:
+        return np.fromiter((self.score(img) for img in imgs), dtype='f8', count=len(imgs))
+
+
+_scorer = None
+
+
+def brisque_scorer() -> BrisqueScorer:
+    """The scorer of this process, created on first use"""
+    global _scorer
+    if _scorer is None:
+        _scorer = BrisqueScorer()
+    return _scorer
+
+
+class MetricKernel:
+    """Sharpness, contrast, entropy, exposure and Sobel resolution of one image in a single pass"""
+
+    def __init__(self, levels: int = 0):
+        self.levels = levels
+        self.shape = None
+
+    def allocate(self, shape):
+        # Buffers are reused for every image of the same size
+        self.shape = shape
+        self.gray = np.empty(shape[:2], dtype=np.uint8)
+        self.pyramid = []
+        h, w = shape[:2]
+        for _ in range(self.levels):
+            h, w = (h + 1) // 2, (w + 1) // 2
+            self.pyramid.append(np.empty((h, w), dtype=np.uint8))
+        self.laplacian = np.empty((h, w), dtype=np.float32)
+        self.gx = np.empty((h, w), dtype=np.float32)
+        self.gy = np.empty((h, w), dtype=np.float32)
+        self.magnitude = np.empty((h, w), dtype=np.float32)
+
+    def compute(self, img) -> dict:
+        if img.shape != self.shape:
+            self.allocate(img.shape)
+        gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY, dst=self.gray)
+        for level in self.pyramid:
+            gray = cv.pyrDown(gray, dst=level, dstsize=level.shape[::-1])
+
+        # Contrast, exposure and entropy all come from the 256-bin histogram (exact counts below 2**24 pixels)
+        hist = cv.calcHist([gray], [0], None, [256], [0, 256]).ravel().astype(np.float64)
+        total = hist.sum()
+        p = hist / total
+        values = np.arange(256, dtype=np.float64)
+        mean_intensity = float(p @ values)
+        variance_intensity = float(p @ (values - mean_intensity) ** 2)
+        nonzero = p[p > 0]
+        entropy = float(-(nonzero * np.log2(nonzero)).sum())
+
+        # Sharpness: variance of the Laplacian (integer valued, so float32 is exact)
+        cv.Laplacian(gray, cv.CV_32F, dst=self.laplacian)
+        _, std = cv.meanStdDev(self.laplacian)
+        # Resolution: mean Sobel gradient magnitude
+        cv.Sobel(gray, cv.CV_32F, 1, 0, dst=self.gx, ksize=5)
+        cv.Sobel(gray, cv.CV_32F, 0, 1, dst=self.gy, ksize=5)
+        cv.magnitude(self.gx, self.gy, self.magnitude)
+
+        return {
+            'Sharpness': float(std[0, 0]) ** 2,
+            'Contrast': variance_intensity ** 0.5,
+            'Entropy': entropy,
+            'Resolution': cv.mean(self.magnitude)[0],
+            'Mean Intensity': mean_intensity,
+            'Variance Intensity': variance_intensity,
+        }
+
+    def metrics(self, img):
+        """(Sharpness, Contrast, Entropy, Resolution), as image_metrics returns them"""
+        result = self.compute(img)
+        return tuple(result[name] for name in FEATURES[:-1])
+
+
+_kernels = {}
+
+
+def metric_kernel(levels: int = 0) -> MetricKernel:
+    """The kernel of this process for the given pyramid level, created on first use"""
+    if levels not in _kernels:
+        _kernels[levels] = MetricKernel(levels)
+    return _kernels[levels]
+
+
+def extract_features(img, levels: int = 0):
+    """(Sharpness, Contrast, Entropy, Resolution, BRISQUE) of one BGR image"""
+    return (*metric_kernel(levels).metrics(img), brisque_scorer().score(img))
+
+
+def image_metrics(img):
+    """(Sharpness, Contrast, Entropy, Resolution) of one BGR image; float64 reference for MetricKernel"""
+    #Grayscale conversion is a common preprocessing step, as it simplifies image data while preserving essential information.
+    gray = cv.cvtColor(img, cv.COLOR_BGR2GRAY)
+    #Laplacian Variance: A common method to assess sharpness is by calculating the variance of the Laplacian of an image.
+    # Higher variance values generally indicate sharper images with more detail.
+    #The Laplacian method can also be used to detect blurriness in an image. A sharp image will have many edges, which leads to a higher variance in the Laplacian values across the image. Conversely, a blurry image will have fewer distinct edges, resulting in a lower variance of the Laplacian.
+    #By calculating the variance of the Laplacian of an image, you can quantify its sharpness. If the variance is below a certain threshold, the image is considered blurry.
+    #Blur Measurement (Laplacian Variance):
+
+    Sharpness = cv.Laplacian(gray, cv.CV_64F).var() #high is better
+    #Sharpness:
+    #Refers to the clarity of edges and fine details in an image. High sharpness makes edges appear crisp and well-defined.
+    #Contrast:
+    #Refers to the difference between the lightest and darkest areas of an image. High contrast can make an image appear more vibrant and punchy, while low contrast can make it look flat.
+
+    #Contrast Measurement (Standard Deviation):
+    #Contrast can be estimated by calculating the standard deviation of pixel intensities in a grayscale image.
+    # Higher standard deviation generally indicates higher contrast.
+    Contrast = np.std(gray)
+
+    #Image Quality Assessment (IQA):
+    #BRISQUE (Blind/Referenceless Image Spatial Quality Evaluator) is a no-reference image quality assessment algorithm that evaluates the perceptual quality of images without requiring a reference image.
+    #It uses features extracted from the image to predict its quality score.
+    #In OpenCV, the `cv.quality.QualityBRISQUE_compute` function computes the BRISQUE score for an image.
+    #This function requires a pre-trained model and range files to evaluate the image quality.
+    #The BRISQUE score is a single value that indicates the quality of the image, where lower scores generally indicate better quality.
+    #Note:
+    #The BRISQUE algorithm is designed to evaluate the perceptual quality of images, and it is particularly useful for assessing images that may have distortions or artifacts.
+    #It is widely used in image processing and computer vision applications to evaluate the quality of images without needing a pristine reference image.
+    # It requires pre-trained model and range files.
+    # The BRISQUE score (lower is better) is computed by BrisqueScorer, which loads these files once per process.
+
+    #Noise Estimation:
+    #.
+    #Entropy was introduced by Shanon (1948), were the higher value of Entropy = more detailed information.
+    # Entropy is a measure of image information content, which is interpreted as the average uncertainty of information source.
+    # In Image, Entropy is defined as corresponding states of intensity level which individual pixels can adapt.
+    # It is used in the quantitative analysis and evaluation image details, the entropy value is used as it provides better
+    # comparison of the image details..
+    Entropy = shannon_entropy(gray)
+
+    # Resolution (using Sobel operator)
+    sobel_x = cv.Sobel(gray, cv.CV_64F, 1, 0, ksize=5)
+    sobel_y = cv.Sobel(gray, cv.CV_64F, 0, 1, ksize=5)
+    _obel = np.sqrt(sobel_x**2 + sobel_y**2)
+    Resolution = np.mean(_obel)
+
+    return Sharpness, Contrast, Entropy, Resolution
+
+
+def read_image(path: str):
+    img = cv.imread(path)
+    if img is None:
+        raise FileNotFoundError(f"Cannot read image: {path}")
+    return img
+
+
+def extract_file(path: str, levels: int = 0):
+    return extract_features(read_image(path), levels)
+
+
+def load_image(path: str, pack_dir: str = None):
+    """Pixels from the packed dataset (image_pack.py) when the image is packed, otherwise from the PNG"""
+    if pack_dir is not None:
+        from image_pack import open_pack
+        img = open_pack(pack_dir).image_at(path)
+        if img is not None:
+            return img
+    return read_image(path)
+
+
+def _extract_chunk(paths: list, levels: int = 0, pack_dir: str = None) -> np.ndarray:
+    """Worker: one record per path, in the order given"""
+    imgs = [load_image(path, pack_dir) for path in paths]
+    records = np.empty(len(paths), dtype=RECORD_DTYPE)
+    kernel = metric_kernel(levels)
+    for i, img in enumerate(imgs):
+        for name, value in zip(FEATURES, kernel.metrics(img)):
+            records[name][i] = value
+    records['BRISQUE'] = brisque_scorer().score_batch(imgs)
+    return records
+
+
+def _init_worker():
+    # One OpenCV thread per process, otherwise the workers compete for the same cores
+    cv.setNumThreads(1)
+    brisque_scorer()
+
+
+def extract_paths(paths: list, workers: int = None, chunksize: int = 8, levels: int = 0, pack_dir: str = None) -> np.ndarray:
+    """Feature records for the given image paths, in input order; workers=1 runs in this process.
+    With pack_dir, packed images are sliced from the memory-mapped pack instead of decoded from PNG."""
+    paths = list(paths)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= chunksize:
+        return _extract_chunk(paths, levels, pack_dir)
+    chunks = [paths[i:i + chunksize] for i in range(0, len(paths), chunksize)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=_init_worker) as pool:
+        # map returns the chunks in submission order, whatever order they finish in
+        return np.concatenate(list(pool.map(_extract_chunk, chunks, [levels] * len(chunks), [pack_dir] * len(chunks))))
+
+
+def scenario_images(problem_sizes: list, N: int, root: str = None) -> list:
+    """(problem_size, scenario, image type, path) for scenarios 1..N of every problem size"""
+    root = root or os.getcwd()
+    images = []
+    for problem_size in problem_sizes:
+        inputfolder = os.path.join(root, f"{problem_size.capitalize()}Folder")
+        for s in range(1, N+1):
+            for imagetype in IMAGE_TYPES:
+                images.append((problem_size, s, imagetype,
+                               os.path.join(inputfolder, f"scenario_{problem_size}_{s}_{imagetype}.png")))
+    return images
+
+
+def benchmark_brisque(paths: list, repeat: int = 3) -> dict:
+    """Seconds per image for QualityBRISQUE_compute (model reloaded every image) and for BrisqueScorer"""
+    imgs = [read_image(path) for path in paths]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        before = [cv.quality.QualityBRISQUE_compute(img, BRISQUE_MODEL, BRISQUE_RANGE)[0] for img in imgs]
+    per_image_before = (time.perf_counter() - start) / (repeat * len(imgs))
+    start = time.perf_counter()
+    scorer = BrisqueScorer()
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeat):
+        after = scorer.score_batch(imgs)
+    per_image_after = (time.perf_counter() - start) / (repeat * len(imgs))
+    return {"images": len(imgs), "load_seconds": load, "per_image_before": per_image_before,
+            "per_image_after": per_image_after, "same_scores": bool(np.allclose(before, after))}
+
+
+def benchmark_metrics(paths: list, repeat: int = 3, levels: int = 0) -> dict:
+    """Seconds per image for image_metrics (float64 reference) and for MetricKernel, with the largest relative difference"""
+    imgs = [read_image(path) for path in paths]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        before = np.array([image_metrics(img) for img in imgs])
+    per_image_before = (time.perf_counter() - start) / (repeat * len(imgs))
+    kernel = MetricKernel(levels)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        after = np.array([kernel.metrics(img) for img in imgs])
+    per_image_after = (time.perf_counter() - start) / (repeat * len(imgs))
+    return {"images": len(imgs), "per_image_before": per_image_before, "per_image_after": per_image_after,
+            "max_relative_difference": float(np.max(np.abs(after / before - 1)))}
+
+
+if __name__ == "__main__":
+    paths = [path for *_, path in scenario_images(['bummer', 'glitch', 'disaster'], 1)]
+    result = benchmark_brisque(paths)
+    print(f"BRISQUE on {result['images']} images: {1000*result['per_image_before']:.1f} ms/image reloading the model, "
+          f"{1000*result['per_image_after']:.1f} ms/image with a reused scorer (one-time load {1000*result['load_seconds']:.1f} ms), "
+          f"same scores: {result['same_scores']}")
+    for levels in [0, 1, 2]:
+        result = benchmark_metrics(paths, levels=levels)
+        print(f"Metrics (pyramid levels {levels}) on {result['images']} images: {1000*result['per_image_before']:.1f} ms/image float64 reference, "
+              f"{1000*result['per_image_after']:.1f} ms/image fused kernel, max relative difference {result['max_relative_difference']:.2e}")
@@ -0,0 +1,167 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import cv2 as cv
+
+# Packed image dataset
+# Decodes every scenario PNG once into memory-mapped uint8 arrays (one .npy file per image shape, in
+# StatsResults/image_pack) with an index by (problem_size, scenario, tool). Analysis code and the feature
+# extraction workers then slice images straight from the page cache, without decoding PNGs again and
+# without copying pixels between processes. Repacking only decodes images that are new or changed.
+# Run this file from the repository root to pack the images in the Bummer/Glitch/Disaster folders.
+
+PACK_DIR = "image_pack"
+INDEX_FILE = "index.csv"
+INDEX_COLUMNS = ['problem_size', 'scenario', 'tool', 'path', 'size', 'mtime', 'file', 'slot']
+
+
+def default_pack_dir() -> str:
+    return os.path.join(os.getcwd(), "StatsResults", PACK_DIR)
+
+
+def shape_file(shape) -> str:
+    return "images_" + "x".join(str(d) for d in shape) + ".npy"
+
+
+def read_png(path: str) -> np.ndarray:
+    img = cv.imread(path)
+    if img is None:
+        raise FileNotFoundError(f"Cannot read image: {path}")
+    return img
+
+
+class ImagePack:
+    """Read-only view of a packed image dataset; images are memory-mapped slices"""
+
+    def __init__(self, pack_dir: str = None):
+        self.pack_dir = pack_dir or default_pack_dir()
+        self.index = pd.read_csv(os.path.join(self.pack_dir, INDEX_FILE))
+        self.arrays = {}
+        self.by_key = {(p, int(s), t): i for i, (p, s, t) in
+                       enumerate(zip(self.index['problem_size'], self.index['scenario'], self.index['tool']))}
+        self.by_path = {path: i for i, path in enumerate(self.index['path'])}
+
+    def array(self, file: str) -> np.ndarray:
+        if file not in self.arrays:
+            self.arrays[file] = np.load(os.path.join(self.pack_dir, file), mmap_mode='r')
+        return self.arrays[file]
+
+    def current(self, i: int, stat: os.stat_result) -> bool:
+        """Whether the packed pixels of row i are those of the file with this stat (same size and mtime)"""
+        return self.index['size'].iat[i] == stat.st_size and self.index['mtime'].iat[i] == stat.st_mtime
+
+    def row(self, i: int) -> np.ndarray:
+        return self.array(self.index['file'].iat[i])[self.index['slot'].iat[i]]
+
+    def image(self, problem_size: str, scenario: int, tool: str) -> np.ndarray:
+        """BGR image (as cv.imread returns it) of one scenario, without copying"""
+        return self.row(self.by_key[(problem_size, int(scenario), tool)])
+
+    def image_at(self, path: str):
+        """Packed image of a PNG path, or None when it is not in the pack or the file changed since packing"""
+        i = self.by_path.get(os.path.abspath(path))
+        if i is None or not self.current(i, os.stat(path)):
+            return None
+        return self.row(i)
+
+    def __len__(self):
+        return len(self.index)
+
+
+_packs = {}
+
+
+def open_pack(pack_dir: str = None) -> ImagePack:
+    """The pack of this process, opened on first use"""
+    pack_dir = pack_dir or default_pack_dir()
+    if pack_dir not in _packs:
+        _packs[pack_dir] = ImagePack(pack_dir)
+    return _packs[pack_dir]
+
+
+def build_pack(images: list, pack_dir: str = None) -> pd.DataFrame:
+    """Pack (problem_size, scenario, tool, path) images; unchanged images are copied from the previous pack"""
+    pack_dir = pack_dir or default_pack_dir()
+    os.makedirs(pack_dir, exist_ok=True)
+    old = None
+    if os.path.exists(os.path.join(pack_dir, INDEX_FILE)):
+        old = ImagePack(pack_dir)
+
+    # Decode what is new or changed, and group every image by shape
+    rows, pixels = [], {}
+    for problem_size, scenario, tool, path in images:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        i = None if old is None else old.by_path.get(path)
+        if i is not None and old.current(i, stat):
+            shape = old.row(i).shape
+            pixels[path] = (old, i)
+        else:
+            img = read_png(path)
+            shape = img.shape
+            pixels[path] = img
+        rows.append([problem_size, int(scenario), tool, path, stat.st_size, stat.st_mtime, shape_file(shape), 0])
+
+    index = pd.DataFrame(rows, columns=INDEX_COLUMNS)
+    index['slot'] = index.groupby('file').cumcount()
+    # Write new arrays next to the old ones, then swap them in, so readers never see a half-written pack
+    for file, group in index.groupby('file'):
+        first = pixels[group['path'].iat[0]]
+        shape = first.shape if isinstance(first, np.ndarray) else first[0].row(first[1]).shape
+        out = np.lib.format.open_memmap(os.path.join(pack_dir, file + ".tmp"), mode='w+', dtype=np.uint8,
+                                        shape=(len(group), *shape))
+        for slot, path in zip(group['slot'], group['path']):
+            source = pixels[path]
+            out[slot] = source if isinstance(source, np.ndarray) else source[0].row(source[1])
+        out.flush()
+        del out
+    if old is not None:
+        old.arrays.clear()
+    for file in index['file'].unique():
+        os.replace(os.path.join(pack_dir, file + ".tmp"), os.path.join(pack_dir, file))
+    index.to_csv(os.path.join(pack_dir, INDEX_FILE), index=False)
+    for file in os.listdir(pack_dir):
+        if file.endswith(".npy") and file not in set(index['file']):
+            os.remove(os.path.join(pack_dir, file))
+    _packs.pop(pack_dir, None)
+    return index
+
+
+def check_pack(images: list, pack_dir: str = None) -> list:
+    """Paths whose packed pixels are read (image_at) but differ from the PNG; empty when the pack is consistent"""
+    pack = open_pack(pack_dir)
+    wrong = []
+    for *_, path in images:
+        img = pack.image_at(path)
+        if img is not None and not np.array_equal(img, read_png(path)):
+            wrong.append(path)
+    return wrong
+
+
+def main():
+    from feature_store import folder_images
+    images = folder_images()
+    start = time.perf_counter()
+    index = build_pack(images)
+    print(f"Packed {len(index)} images into {default_pack_dir()} in {time.perf_counter() - start:.2f} s")
+
+    # Reading every image: PNG decoding vs memory-mapped slices
+    start = time.perf_counter()
+    for *_, path in images:
+        cv.imread(path)
+    decode = (time.perf_counter() - start) / len(images)
+    pack = open_pack()
+    start = time.perf_counter()
+    for problem_size, scenario, tool, _ in images:
+        np.asarray(pack.image(problem_size, scenario, tool)).sum(dtype=np.uint64)
+    mapped = (time.perf_counter() - start) / len(images)
+    print(f"{1000*decode:.1f} ms/image decoding PNGs, {1000*mapped:.1f} ms/image reading (and summing) the pack")
+
+    # A PNG changed after packing must be decoded again, never read from the pack
+    wrong = check_pack(images)
+    print(f"Pack check: {len(wrong)} images read from the pack differ from their PNG")
+
+
+if __name__ == "__main__":
+    main()
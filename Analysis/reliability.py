@@ -0,0 +1,159 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import f
+from resampling import B_DEFAULT, bootstrap_indices, resample_weights
+
+# Inter-rater reliability on the wide (subjects x raters) rating matrix
+# ICC(1), ICC(2), ICC(3), single and average measures (Shrout & Fleiss, same F tests and parametric CIs as
+# pingouin.intraclass_corr) and Krippendorff's alpha for interval data, computed from per-subject sums, so
+# bootstrap resamples of the subjects are one (B x n) weight matrix times those sums (resampling.py).
+# Missing ratings are NaN: ICC uses the subjects rated by every rater (as pingouin does), Krippendorff's
+# alpha uses every subject with at least two ratings.
+
+ICC_TYPES = ["ICC1", "ICC2", "ICC3", "ICC1k", "ICC2k", "ICC3k"]
+ICC_DESCRIPTIONS = ["Single raters absolute", "Single random raters", "Single fixed raters",
+                    "Average raters absolute", "Average random raters", "Average fixed raters"]
+
+
+def rating_matrix(df: pd.DataFrame, metric: str) -> np.ndarray:
+    """Ratings of one metric (columns metric1, metric2, ...) as a float (subjects x raters) matrix"""
+    columns = [c for c in df.columns if c.startswith(metric) and c[len(metric):].isdigit()]
+    return df[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+
+def mean_squares(ratings: np.ndarray, weights: np.ndarray = None):
+    """Two-way ANOVA mean squares (subjects, within subjects, raters, error) of a complete matrix;
+    with (B x n) weights, one set per resample"""
+    n, k = ratings.shape
+    weights = np.ones((1, n)) if weights is None else weights
+    row_means = ratings.mean(axis=1)
+    col_means = weights @ ratings / n
+    grand = col_means.mean(axis=1)
+    ss_total = weights @ (ratings**2).sum(axis=1) - n * k * grand**2
+    ss_subjects = k * (weights @ row_means**2 - n * grand**2)
+    ss_raters = n * ((col_means**2).sum(axis=1) - k * grand**2)
+    ss_error = ss_total - ss_subjects - ss_raters
+    msb = ss_subjects / (n - 1)
+    msw = (ss_total - ss_subjects) / (n * (k - 1))
+    msj = ss_raters / (k - 1)
+    mse = ss_error / ((n - 1) * (k - 1))
+    return msb, msw, msj, mse
+
+
+def icc_values(msb, msw, msj, mse, n: int, k: int) -> np.ndarray:
+    """(6 x B) ICCs in the order of ICC_TYPES"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.array([
+            (msb - msw) / (msb + (k - 1) * msw),
+            (msb - mse) / (msb + (k - 1) * mse + k * (msj - mse) / n),
+            (msb - mse) / (msb + (k - 1) * mse),
+            (msb - msw) / msb,
+            (msb - mse) / (msb + (msj - mse) / n),
+            (msb - mse) / msb,
+        ])
+
+
+def complete_subjects(ratings: np.ndarray) -> np.ndarray:
+    return ratings[~np.isnan(ratings).any(axis=1)]
+
+
+def icc(ratings: np.ndarray, weights: np.ndarray = None) -> np.ndarray:
+    """ICCs of the subjects rated by every rater; (6,) or, with (B x n) weights, (6 x B)"""
+    ratings = complete_subjects(ratings)
+    n, k = ratings.shape
+    values = icc_values(*mean_squares(ratings, weights), n, k)
+    return values if weights is not None else values[:, 0]
+
+
+def parametric_ci(msb, msw, msj, mse, n: int, k: int, alpha: float = 0.05) -> list:
+    """F-distribution confidence intervals of the six ICCs (Shrout & Fleiss; McGraw & Wong for ICC2)"""
+    icc2 = (msb - mse) / (msb + (k - 1) * mse + k * (msj - mse) / n)
+    f1, f3 = msb / msw, msb / mse
+    df1, df1kd, df2kd = n - 1, n * (k - 1), (n - 1) * (k - 1)
+    f1l, f1u = f1 / f.ppf(1 - alpha / 2, df1, df1kd), f1 * f.ppf(1 - alpha / 2, df1kd, df1)
+    f3l, f3u = f3 / f.ppf(1 - alpha / 2, df1, df2kd), f3 * f.ppf(1 - alpha / 2, df2kd, df1)
+    fj = msj / mse
+    vn = df2kd * (k * icc2 * fj + n * (1 + (k - 1) * icc2) - k * icc2) ** 2
+    vd = df1 * k**2 * icc2**2 * fj**2 + (n * (1 + (k - 1) * icc2) - k * icc2) ** 2
+    v = vn / vd
+    f2u, f2l = f.ppf(1 - alpha / 2, n - 1, v), f.ppf(1 - alpha / 2, v, n - 1)
+    l2 = n * (msb - f2u * mse) / (f2u * (k * msj + (k * n - k - n) * mse) + n * msb)
+    u2 = n * (f2l * msb - mse) / (k * msj + (k * n - k - n) * mse + n * f2l * msb)
+    return [
+        ((f1l - 1) / (f1l + k - 1), (f1u - 1) / (f1u + k - 1)),
+        (l2, u2),
+        ((f3l - 1) / (f3l + k - 1), (f3u - 1) / (f3u + k - 1)),
+        (1 - 1 / f1l, 1 - 1 / f1u),
+        (l2 * k / (1 + l2 * (k - 1)), u2 * k / (1 + u2 * (k - 1))),
+        (1 - 1 / f3l, 1 - 1 / f3u),
+    ]
+
+
+def icc_table(ratings: np.ndarray, B: int = B_DEFAULT, alpha: float = 0.05, seed=0) -> pd.DataFrame:
+    """pingouin-style ICC table (Type, Description, ICC, F, df1, df2, pval, CI95%) plus bootstrap CIs"""
+    ratings = complete_subjects(ratings)
+    n, k = ratings.shape
+    msb, msw, msj, mse = (m[0] for m in mean_squares(ratings))
+    estimates = icc_values(msb, msw, msj, mse, n, k)
+    f1, f3 = msb / msw, msb / mse
+    df1kd, df2kd = n * (k - 1), (n - 1) * (k - 1)
+    p1, p3 = f.sf(f1, n - 1, df1kd), f.sf(f3, n - 1, df2kd)
+    weights = resample_weights(bootstrap_indices(n, B, seed))
+    replicates = icc_values(*mean_squares(ratings, weights), n, k)
+    lower, upper = np.nanquantile(replicates, [alpha / 2, 1 - alpha / 2], axis=1)
+    return pd.DataFrame({
+        'Type': ICC_TYPES,
+        'Description': ICC_DESCRIPTIONS,
+        'ICC': estimates,
+        'F': [f1, f3, f3, f1, f3, f3],
+        'df1': n - 1,
+        'df2': [df1kd, df2kd, df2kd, df1kd, df2kd, df2kd],
+        'pval': [p1, p3, p3, p1, p3, p3],
+        'CI95%': [np.round(ci, 2) for ci in parametric_ci(msb, msw, msj, mse, n, k, alpha)],
+        'Bootstrap CI_Lower': lower,
+        'Bootstrap CI_Upper': upper,
+    })
+
+
+def krippendorff_alpha(ratings: np.ndarray, weights: np.ndarray = None):
+    """Krippendorff's alpha for interval data of a (subjects x raters) matrix with NaN for missing ratings;
+    with (B x n) weights, one value per resample"""
+    present = ~np.isnan(ratings)
+    values = np.where(present, ratings, 0.0)
+    m = present.sum(axis=1).astype(float)
+    # Only subjects with at least two ratings are pairable
+    m = np.where(m >= 2, m, 0.0)
+    s1 = np.where(m > 0, values.sum(axis=1), 0.0)
+    s2 = np.where(m > 0, (values**2).sum(axis=1), 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Sum of squared differences over all ordered pairs of ratings of a subject, divided by m_u - 1
+        within = np.where(m > 0, 2 * (m * s2 - s1**2) / (m - 1), 0.0)
+        weights = np.ones((1, len(m))) if weights is None else weights
+        n, S1, S2 = weights @ m, weights @ s1, weights @ s2
+        observed = weights @ within / n
+        expected = 2 * (n * S2 - S1**2) / (n * (n - 1))
+        alpha = 1 - observed / expected
+    return alpha if alpha.shape[0] > 1 else float(alpha[0])
+
+
+def reliability_table(df: pd.DataFrame, metrics: list, by: list = None, B: int = B_DEFAULT, alpha: float = 0.05, seed=0) -> pd.DataFrame:
+    """ICCs and Krippendorff's alpha with bootstrap CIs for every metric, overall and per value of each column in by"""
+    strata = [("all", "all", df.index.to_numpy())]
+    for column in by or []:
+        strata += [(column, value, index) for value, index in df.groupby(column).indices.items()]
+    rows = []
+    for metric in metrics:
+        ratings = rating_matrix(df, metric)
+        for column, value, index in strata:
+            subset = ratings[index]
+            complete = complete_subjects(subset)
+            weights = resample_weights(bootstrap_indices(len(complete), B, seed))
+            statistics = list(zip(ICC_TYPES, icc(complete), icc(complete, weights)))
+            weights = resample_weights(bootstrap_indices(len(subset), B, seed))
+            statistics.append(("Krippendorff alpha", krippendorff_alpha(subset), krippendorff_alpha(subset, weights)))
+            for name, estimate, replicates in statistics:
+                lower, upper = np.nanquantile(replicates, [alpha / 2, 1 - alpha / 2])
+                rows.append({'metric': metric, 'stratum': column, 'value': value, 'statistic': name,
+                             'n_subjects': len(complete) if name in ICC_TYPES else len(subset),
+                             'estimate': estimate, 'CI_Lower': lower, 'CI_Upper': upper})
+    return pd.DataFrame(rows)
@@ -0,0 +1,158 @@
+import matplotlib
+matplotlib.use("Agg")  # headless: render to files, never open a window
+import os
+import sys
+import html
+import time
+import glob
+import functools
+import importlib.util
+from multiprocessing import Pool
+import pandas as pd
+import matplotlib.pyplot as plt
+
+# Headless batch report
+# Renders every analysis figure into StatsResults in one process (or on a pool of worker processes) with the
+# Agg backend, from the results the analysis scripts already saved, so nothing blocks on plt.show() and
+# matplotlib is imported and set up once:
+#   confusion matrices of every model, modality and tool         ConfusionMatrix_{model}_{modality}[_{tool}].png
+#   win-probability curves (ImageAnalysis_Stats_Quant.csv)      ImageAnalysis_Probabilities_combined_high_95%.png
+#   human evaluation means and paired differences with 95% CI  plot_*_95ci.png, paired_diff_*_95ci.png
+#   binomial power curves of the observed accuracies            binomial_power_curves.png
+# and writes an index of the figures and result tables to StatsResults/report.html and StatsResults/report.md.
+# Figures whose inputs are missing are skipped. Run this file from the repository root.
+
+ANALYSIS_DIR = os.path.dirname(os.path.abspath(__file__))
+SECTIONS = {"confusion": "Confusion matrices", "win_probabilities": "Quantitative image analysis",
+            "human_eval": "Human evaluation", "power": "Classification power"}
+
+
+def load_script(name: str):
+    """Import an analysis script by file name (several have spaces in their names)"""
+    if ANALYSIS_DIR not in sys.path:
+        sys.path.insert(0, ANALYSIS_DIR)
+    spec = importlib.util.spec_from_file_location(name.replace(" ", "_"), os.path.join(ANALYSIS_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@functools.lru_cache(maxsize=None)
+def predictions(input_dir: str) -> pd.DataFrame:
+    from classification_metrics import load_predictions
+    return load_predictions(input_dir)
+
+
+def figure_tasks(input_dir: str) -> list:
+    """(kind, key) of every figure that can be rendered from the results in input_dir"""
+    tasks = []
+    try:
+        from classification_metrics import confusion_matrices
+        slices, _ = confusion_matrices(predictions(input_dir))
+        tasks += [("confusion", tuple(row)) for row in slices.itertuples(index=False)]
+    except FileNotFoundError:
+        pass
+    if os.path.exists(os.path.join(input_dir, "ImageAnalysis_Stats_Quant.csv")):
+        tasks.append(("win_probabilities", None))
+    if os.path.exists(os.path.join(input_dir, "Group Evaluation - combined.csv")):
+        tasks.append(("human_eval", None))
+    if any(kind == "confusion" for kind, _ in tasks):
+        tasks.append(("power", None))
+    return tasks
+
+
+def save(fig, path: str) -> str:
+    fig.savefig(path, dpi=150)
+    plt.close(fig)
+    return path
+
+
+def render(task, input_dir: str = None) -> list:
+    """Render one task; returns (title, path) of every figure written"""
+    kind, key = task
+    input_dir = input_dir or os.path.join(os.getcwd(), "StatsResults")
+    if kind == "confusion":
+        from classification_metrics import LABELS, confusion_matrices, plot_confusion_matrix, slice_title
+        model, modality, tool = key
+        df = predictions(input_dir)
+        _, counts = confusion_matrices(df[(df["model"] == model) & (df["modality"] == modality) & (df["tool"] == tool)])
+        title = slice_title(model, modality, tool)
+        plot_confusion_matrix(counts[0, :, :len(LABELS)], title)
+        name = "_".join(["ConfusionMatrix", model, modality] + ([tool] if tool else []))
+        return [(title, save(plt.gcf(), os.path.join(input_dir, f"{name}.png")))]
+    if kind == "win_probabilities":
+        quant = load_script("Quant_ImageAnalysis")
+        stats_df = pd.read_csv(os.path.join(input_dir, "ImageAnalysis_Stats_Quant.csv"))
+        path = os.path.join(input_dir, "ImageAnalysis_Probabilities_combined_high_95%.png")
+        return [("Probability GPTimage is better than DallE3", save(quant.plot_win_probabilities(stats_df), path))]
+    if kind == "human_eval":
+        human = load_script("HumanEval_Image analysis")
+        paths = human.plot_all(*human.load_ratings(os.path.join(input_dir, "Group Evaluation - combined.csv")))
+        return [(os.path.splitext(os.path.basename(p))[0].replace("_", " "), p) for p in paths]
+    if kind == "power":
+        power = load_script("Classification power")
+        accuracies = power.classification_accuracies(input_dir)
+        labels = [" ".join(str(v) for v in row if v) for row in accuracies[['Model', 'Modality', 'Image_Tool']].itertuples(index=False)]
+        # Bonferroni over the modality/model comparisons, as in the sample-size plan
+        fig = power.plot_power_curves(accuracies['Accuracy'], labels, alpha=power.bonferroni_alpha(accuracies))
+        return [("Binomial power of the observed accuracies", save(fig, os.path.join(input_dir, "binomial_power_curves.png")))]
+    raise ValueError(f"unknown figure: {kind}")
+
+
+def write_index(figures: list, input_dir: str, seconds: float) -> tuple:
+    """StatsResults/report.html and report.md listing every figure by section and every result table"""
+    tables = sorted(os.path.basename(p) for p in glob.glob(os.path.join(input_dir, "*.csv")))
+    stamp = time.strftime("%Y-%m-%d %H:%M")
+    md = [f"# Analysis report", "", f"Rendered {len(figures)} figures on {stamp} in {seconds:.1f} s.", ""]
+    body = [f"<h1>Analysis report</h1>", f"<p>Rendered {len(figures)} figures on {stamp} in {seconds:.1f} s.</p>"]
+    for kind, section in SECTIONS.items():
+        entries = [(title, path) for k, title, path in figures if k == kind]
+        if not entries:
+            continue
+        md += [f"## {section}", ""]
+        body.append(f"<h2>{html.escape(section)}</h2>")
+        for title, path in entries:
+            name = os.path.basename(path)
+            md += [f"### {title}", "", f"![{title}](<{name}>)", ""]
+            body.append(f'<figure><img src="{html.escape(name)}" alt="{html.escape(title)}" style="max-width:100%">'
+                        f"<figcaption>{html.escape(title)}</figcaption></figure>")
+    md += ["## Result tables", ""] + [f"- [{name}](<{name}>)" for name in tables]
+    body.append("<h2>Result tables</h2><ul>" + "".join(f'<li><a href="{html.escape(n)}">{html.escape(n)}</a></li>' for n in tables) + "</ul>")
+    md_path = os.path.join(input_dir, "report.md")
+    html_path = os.path.join(input_dir, "report.html")
+    with open(md_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(md) + "\n")
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Analysis report</title></head><body>\n'
+                + "\n".join(body) + "\n</body></html>\n")
+    return html_path, md_path
+
+
+def render_report(input_dir: str = None, workers: int = 1) -> list:
+    """Render every figure and the index; returns (kind, title, path) of every figure"""
+    input_dir = input_dir or os.path.join(os.getcwd(), "StatsResults")
+    start = time.perf_counter()
+    tasks = figure_tasks(input_dir)
+    if workers > 1:
+        with Pool(workers) as pool:
+            rendered = pool.starmap(render, [(task, input_dir) for task in tasks])
+    else:
+        rendered = [render(task, input_dir) for task in tasks]
+    figures = [(kind, title, path) for (kind, _), written in zip(tasks, rendered) for title, path in written]
+    write_index(figures, input_dir, time.perf_counter() - start)
+    return figures
+
+
+def main():
+    workers = 1 #number of processes rendering figures, 1 = render everything in this process
+    input_dir = os.path.join(os.getcwd(), "StatsResults")
+    start = time.perf_counter()
+    figures = render_report(input_dir, workers)
+    for kind, title, path in figures:
+        print(f"{SECTIONS[kind]}: {os.path.basename(path)}")
+    print(f"Rendered {len(figures)} figures in {time.perf_counter() - start:.1f} s")
+    print(f"Index: {os.path.join(input_dir, 'report.html')}")
+
+
+if __name__ == "__main__":
+    main()
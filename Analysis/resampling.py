@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+# Vectorized resampling for paired model comparisons
+# Bootstrap confidence intervals and paired (sign-flip) permutation p-values for many metrics at once.
+# The B resamples are drawn as one (B x n) index matrix (or sign matrix) and every statistic is a matrix
+# product over it, so there is no Python loop over resamples: 10,000 resamples of a few hundred pairs
+# and several metrics take milliseconds.
+# Differences are oriented so that positive means the first model (GPT-4o / GPTimage) is better.
+
+B_DEFAULT = 10000
+
+
+def bootstrap_indices(n: int, B: int = B_DEFAULT, seed=0) -> np.ndarray:
+    """(B x n) matrix of row indices drawn with replacement"""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, n, size=(B, n))
+
+
+def resample_weights(indices: np.ndarray) -> np.ndarray:
+    """(B x n) matrix counting how often each row appears in each resample"""
+    B, n = indices.shape
+    offsets = (indices + n * np.arange(B)[:, None]).ravel()
+    return np.bincount(offsets, minlength=B * n).reshape(B, n)
+
+
+def bootstrap_means(values, B: int = B_DEFAULT, seed=0) -> np.ndarray:
+    """(B x k) bootstrap replicates of the column means of an (n x k) array"""
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    weights = resample_weights(bootstrap_indices(len(values), B, seed))
+    return weights @ values / len(values)
+
+
+def bootstrap_ci(values, B: int = B_DEFAULT, alpha: float = 0.05, seed=0):
+    """Column means of an (n x k) array with percentile bootstrap intervals: (estimate, lower, upper)"""
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, None]
+    replicates = bootstrap_means(values, B, seed)
+    lower, upper = np.quantile(replicates, [alpha / 2, 1 - alpha / 2], axis=0)
+    return values.mean(axis=0), lower, upper
+
+
+def permutation_pvalues(diffs, B: int = B_DEFAULT, alternative: str = "greater", seed=0) -> np.ndarray:
+    """Paired permutation p-values of the mean difference per column, flipping the sign of each pair"""
+    diffs = np.asarray(diffs, dtype=float)
+    if diffs.ndim == 1:
+        diffs = diffs[:, None]
+    rng = np.random.default_rng(seed)
+    signs = rng.integers(0, 2, size=(B, len(diffs)), dtype=np.int8) * 2 - 1
+    permuted = signs @ diffs
+    observed = diffs.sum(axis=0)
+    # Small tolerance so that ties with the observed statistic count as at least as extreme
+    tol = 1e-9 * np.maximum(1.0, np.abs(diffs).sum(axis=0))
+    if alternative == "greater":
+        extreme = (permuted >= observed - tol).sum(axis=0)
+    elif alternative == "less":
+        extreme = (permuted <= observed + tol).sum(axis=0)
+    else:
+        extreme = (np.abs(permuted) >= np.abs(observed) - tol).sum(axis=0)
+    return (extreme + 1) / (B + 1)
+
+
+def paired_summary(diffs: pd.DataFrame, B: int = B_DEFAULT, alpha: float = 0.05, seed=0) -> pd.DataFrame:
+    """One row per metric: mean difference and win probability with bootstrap CIs, and a one-sided permutation p-value"""
+    values = diffs.to_numpy(dtype=float)
+    wins = (values > 0).astype(float)
+    # The same resamples for the mean difference and the win probability
+    weights = resample_weights(bootstrap_indices(len(values), B, seed))
+    both = np.hstack([values, wins])
+    replicates = weights @ both / len(values)
+    lower, upper = np.quantile(replicates, [alpha / 2, 1 - alpha / 2], axis=0)
+    k = values.shape[1]
+    return pd.DataFrame({
+        'metric': list(diffs.columns),
+        'n_pairs': len(values),
+        'mean_diff': values.mean(axis=0),
+        'mean_diff LB': lower[:k],
+        'mean_diff UB': upper[:k],
+        'win_prob': wins.mean(axis=0),
+        'win_prob LB': lower[k:],
+        'win_prob UB': upper[k:],
+        'p_value': permutation_pvalues(values, B, "greater", seed),
+    })
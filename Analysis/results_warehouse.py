@@ -0,0 +1,181 @@
+import os
+import re
+import glob
+import json
+import shutil
+import pandas as pd
+
+# Columnar results warehouse
+# Consolidates the generation and classification CSVs into typed, partitioned Parquet datasets under
+# StatsResults/warehouse, keyed by problem_size, scenario, tool, modality and model:
+#   generation      *Folder/Stats_summary_{problem}_combined.csv                      partitioned by problem_size
+#   classification  StatsResults/PE_Stats_summary_{problem}_combined_{model}_classify_{modality}.csv
+#                                                                                     partitioned by model, modality
+#   human_eval      StatsResults/Group Evaluation - combined.csv (one row per rated image, item = row number)
+# Analysis scripts read only the columns and partitions they need (read_table with filters is pushed down
+# to the Parquet partitions and row groups) and fall back to the CSVs when the warehouse is missing or older
+# than its sources. Requires pyarrow; run this file from the repository root after generating or classifying.
+
+WAREHOUSE_DIR = "warehouse"
+MANIFEST_FILE = "manifest.json"
+PARTITIONS = {"generation": ["problem_size"], "classification": ["model", "modality"], "human_eval": []}
+TIMES = ["Total_Time", "Time_Script", "Time_Image", "Time_Voice", "Time_Video"]
+CLASSIFY_PATTERN = re.compile(r"PE_Stats_summary_(\w+?)_combined_(\w+?)_classify_(\w+)\.csv$")
+
+
+def default_warehouse_dir(root: str = None) -> str:
+    return os.path.join(root or os.getcwd(), "StatsResults", WAREHOUSE_DIR)
+
+
+def table_sources(name: str, root: str = None) -> list:
+    root = root or os.getcwd()
+    if name == "generation":
+        return sorted(glob.glob(os.path.join(root, "*Folder", "Stats_summary_*_combined.csv")))
+    if name == "classification":
+        return sorted(p for p in glob.glob(os.path.join(root, "StatsResults", "PE_Stats_summary_*_classify_*.csv"))
+                      if CLASSIFY_PATTERN.search(os.path.basename(p)))
+    if name == "human_eval":
+        path = os.path.join(root, "StatsResults", "Group Evaluation - combined.csv")
+        return [path] if os.path.exists(path) else []
+    raise KeyError(f"unknown table: {name}")
+
+
+def typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Explicit column types for the shared columns"""
+    df = df.copy()
+    if "scenario" in df.columns:
+        df["scenario"] = pd.to_numeric(df["scenario"], errors="coerce").astype("Int32")
+    for column in TIMES:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float32")
+    for column in df.columns:
+        if df[column].dtype == object or str(df[column].dtype) in ("str", "string"):
+            df[column] = df[column].astype("string")
+    return df
+
+
+def load_generation(paths: list) -> pd.DataFrame:
+    dfs = []
+    for path in paths:
+        df = pd.read_csv(path, dtype={"Image_Tool": str, "Problem Size": str, "setting": str, "Script": str})
+        df = df.rename(columns={"Image_Tool": "tool", "Problem Size": "problem_size"})
+        df["problem_size"] = df["problem_size"].str.strip().str.lower()
+        dfs.append(df)
+    return typed(pd.concat(dfs, ignore_index=True))
+
+
+def load_classification(paths: list) -> pd.DataFrame:
+    dfs = []
+    for path in paths:
+        problem_size, model, modality = CLASSIFY_PATTERN.search(os.path.basename(path)).groups()
+        df = pd.read_csv(path, dtype=str)
+        df = df.rename(columns={"Image_Tool": "tool", "Problem Size": "truth", "Predicted Problem Size": "prediction",
+                                "Image Path": "path", "Video Path": "path"})
+        if "tool" not in df.columns:
+            df["tool"] = ""
+        df["problem_size"] = problem_size
+        df["model"] = model
+        df["modality"] = modality
+        df["truth"] = df["truth"].str.strip().str.lower()
+        df["prediction"] = df["prediction"].fillna("").str.strip().str.lower()
+        dfs.append(df)
+    df = pd.concat(dfs, ignore_index=True)
+    df["tool"] = df["tool"].fillna("")
+    return typed(df)
+
+
+def load_human_eval(paths: list) -> pd.DataFrame:
+    df = pd.read_csv(paths[0])
+    df.columns = [c.strip() for c in df.columns]
+    df.insert(0, "item", range(1, len(df) + 1))
+    df = df.rename(columns={"type": "tool"})
+    for column in df.columns:
+        if column.startswith(("Alignment", "Aesthetics", "AVG")):
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float32")
+    df["item"] = df["item"].astype("int32")
+    return typed(df)
+
+
+LOADERS = {"generation": load_generation, "classification": load_classification, "human_eval": load_human_eval}
+
+
+def read_manifest(warehouse_dir: str) -> dict:
+    path = os.path.join(warehouse_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def source_state(paths: list) -> dict:
+    return {os.path.abspath(p): os.path.getmtime(p) for p in paths}
+
+
+def is_current(name: str, root: str = None, warehouse_dir: str = None) -> bool:
+    """True when the table exists and was built from the current version of every source file"""
+    warehouse_dir = warehouse_dir or default_warehouse_dir(root)
+    entry = read_manifest(warehouse_dir).get(name)
+    if not entry or not os.path.isdir(os.path.join(warehouse_dir, name)):
+        return False
+    return entry["sources"] == source_state(table_sources(name, root))
+
+
+def ingest(root: str = None, warehouse_dir: str = None, tables: list = None) -> dict:
+    """(Re)build the tables whose sources changed; returns the number of rows of every rebuilt table"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    warehouse_dir = warehouse_dir or default_warehouse_dir(root)
+    os.makedirs(warehouse_dir, exist_ok=True)
+    manifest = read_manifest(warehouse_dir)
+    built = {}
+    for name in tables or list(LOADERS):
+        sources = table_sources(name, root)
+        if not sources or is_current(name, root, warehouse_dir):
+            continue
+        df = LOADERS[name](sources)
+        # Write next to the old table and swap, so readers never see a half-written dataset
+        target = os.path.join(warehouse_dir, name)
+        staging = target + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if PARTITIONS[name]:
+            pq.write_to_dataset(table, staging, partition_cols=PARTITIONS[name])
+        else:
+            os.makedirs(staging)
+            pq.write_table(table, os.path.join(staging, "part-0.parquet"))
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+        manifest[name] = {"sources": source_state(sources), "rows": len(df), "columns": list(df.columns)}
+        built[name] = len(df)
+    with open(os.path.join(warehouse_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return built
+
+
+def read_table(name: str, columns: list = None, filters: list = None, warehouse_dir: str = None) -> pd.DataFrame:
+    """Columns of one table, e.g. filters=[("model", "==", "gemini"), ("modality", "in", ["image", "video"])]"""
+    warehouse_dir = warehouse_dir or default_warehouse_dir()
+    path = os.path.join(warehouse_dir, name)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"No {name} table in {warehouse_dir}; run Analysis/results_warehouse.py first")
+    df = pd.read_parquet(path, engine="pyarrow", columns=columns, filters=filters)
+    # Partition columns come back as categoricals
+    for column in PARTITIONS[name]:
+        if column in df.columns:
+            df[column] = df[column].astype("string")
+    return df
+
+
+def main():
+    built = ingest()
+    warehouse_dir = default_warehouse_dir()
+    manifest = read_manifest(warehouse_dir)
+    for name in LOADERS:
+        if name in manifest:
+            state = f"rebuilt, {built[name]} rows" if name in built else f"up to date, {manifest[name]['rows']} rows"
+            print(f"{name}: {state}")
+    print(f"Warehouse: {warehouse_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from scipy.optimize import brentq
+from image_features import FEATURES
+
+# Group-sequential stopping rule for scenario generation
+# The generator produces up to max_n scenarios per problem size. This monitor receives the image metrics of
+# every scenario as it lands (and optionally whether a classifier got it right), tests the accumulated wins
+# at every look_every scenarios against an alpha-spending boundary (Lan-DeMets, O'Brien-Fleming type), and
+# tells the generator to stop once every monitored comparison is decided.
+#   image metrics: H0 P(GPTimage better than DallE3) = 0.5, two-sided (BRISQUE: lower is better)
+#   classification accuracy (optional): H0 accuracy = 1/3 (chance), one-sided
+# The overall alpha is split equally (Bonferroni) over the monitored comparisons.
+# Run this file from the repository root to replay the stored image features (feature_store.py) through the
+# monitor and see at which n each problem size could have stopped.
+
+LOWER_IS_BETTER = ['BRISQUE']
+
+
+def obrien_fleming_spending(t, alpha: float = 0.05):
+    """Cumulative alpha spent at information fraction t (Lan-DeMets O'Brien-Fleming type)"""
+    t = np.asarray(t, dtype=float)
+    return 2 * (1 - norm.cdf(norm.ppf(1 - alpha / 2) / np.sqrt(t)))
+
+
+def spending_boundaries(fractions, alpha: float = 0.05, sides: int = 2, grid: int = 801) -> np.ndarray:
+    """Z boundaries at the given information fractions, by numerical integration over the continuation region"""
+    fractions = np.asarray(fractions, dtype=float)
+    spent = obrien_fleming_spending(fractions, alpha)
+    boundaries = np.empty(len(fractions))
+    u = density = None
+    t_prev = 0.0
+    for k, t in enumerate(fractions):
+        target = spent[k] - (spent[k-1] if k else 0.0)
+        if k == 0:
+            z = norm.ppf(1 - target / sides)
+            b = z * np.sqrt(t)
+        else:
+            sd = np.sqrt(t - t_prev)
+
+            def crossing(b):
+                upper = norm.sf((b - u) / sd)
+                lower = norm.cdf((-b - u) / sd) if sides == 2 else 0.0
+                return np.trapezoid(density * (upper + lower), u)
+
+            if target <= 0:
+                b = np.inf
+            else:
+                hi = np.abs(u).max() + 10 * sd
+                b = brentq(lambda b: crossing(b) - target, 1e-9, hi) if crossing(1e-9) > target else 1e-9
+            z = b / np.sqrt(t)
+        boundaries[k] = z
+
+        # Density of the score statistic S = Z*sqrt(t) on the continuation region
+        # (truncated at 8 standard deviations, which also covers an infinite boundary when nothing is spent yet)
+        high = min(b, 8 * np.sqrt(t))
+        s = np.linspace(-high if sides == 2 else -8 * np.sqrt(t), high, grid)
+        if k == 0:
+            density = norm.pdf(s / np.sqrt(t)) / np.sqrt(t)
+        else:
+            kernel = norm.pdf((s[:, None] - u[None, :]) / sd) / sd
+            density = np.trapezoid(kernel * density[None, :], u, axis=1)
+        u, t_prev = s, t
+    return boundaries
+
+
+class SequentialMonitor:
+    """Accumulates per-scenario outcomes and decides at every look whether generation can stop"""
+
+    def __init__(self, max_n: int = 100, look_every: int = 10, alpha: float = 0.05,
+                 metrics: list = FEATURES, accuracy: bool = False, chance: float = 1/3):
+        self.max_n = max_n
+        self.looks = sorted(set(range(look_every, max_n + 1, look_every)) | {max_n})
+        self.streams = {metric: {"p0": 0.5, "sides": 2} for metric in metrics}
+        if accuracy:
+            self.streams["Accuracy"] = {"p0": chance, "sides": 1}
+        stream_alpha = alpha / len(self.streams)
+        fractions = np.asarray(self.looks) / max_n
+        for stream in self.streams.values():
+            stream.update(successes=0, n=0, decided=None, boundaries=spending_boundaries(fractions, stream_alpha, stream["sides"]))
+        self.history = []
+
+    def add_images(self, gptimage: dict, dalle3: dict) -> None:
+        """Metrics of the GPTimage and DallE3 image of one scenario"""
+        for metric in self.streams:
+            if metric == "Accuracy":
+                continue
+            diff = gptimage[metric] - dalle3[metric]
+            self.add(metric, diff < 0 if metric in LOWER_IS_BETTER else diff > 0)
+
+    def add_classification(self, correct: bool) -> None:
+        self.add("Accuracy", correct)
+
+    def add(self, stream: str, success: bool) -> None:
+        s = self.streams[stream]
+        s["n"] += 1
+        s["successes"] += int(bool(success))
+
+    def check(self) -> bool:
+        """Test every undecided stream whose sample size is at a look; returns True when generation can stop"""
+        for name, s in self.streams.items():
+            if s["decided"] is not None or s["n"] not in self.looks:
+                continue
+            look = self.looks.index(s["n"])
+            z = (s["successes"] - s["n"] * s["p0"]) / np.sqrt(s["n"] * s["p0"] * (1 - s["p0"]))
+            boundary = s["boundaries"][look]
+            crossed = abs(z) >= boundary if s["sides"] == 2 else z >= boundary
+            if crossed:
+                s["decided"] = "better" if z > 0 else "worse"
+            elif s["n"] >= self.max_n:
+                s["decided"] = "no difference"
+            self.history.append({"stream": name, "n": s["n"], "successes": s["successes"],
+                                 "rate": s["successes"] / s["n"], "z": z, "boundary": boundary,
+                                 "decision": s["decided"] or "continue"})
+        return self.stop
+
+    @property
+    def stop(self) -> bool:
+        return all(s["decided"] is not None for s in self.streams.values())
+
+    def report(self) -> pd.DataFrame:
+        return pd.DataFrame(self.history)
+
+
+def main():
+    from feature_store import FeatureStore
+    store = FeatureStore()
+    features = store.query()
+    store.close()
+    reports = []
+    for problem_size, group in features.groupby('problem_size'):
+        wide = group.pivot(index='Scenario', columns='Image Type', values=FEATURES).sort_index()
+        monitor = SequentialMonitor(max_n=100)
+        stopped = None
+        for scenario in wide.index:
+            row = wide.loc[scenario]
+            monitor.add_images(row.xs('GPTimage', level='Image Type'), row.xs('DallE3', level='Image Type'))
+            if monitor.check():
+                stopped = scenario
+                break
+        print(f"{problem_size}: " + (f"could have stopped after {stopped} scenarios" if stopped else
+                                     f"not decided after {len(wide)} scenarios"))
+        report = monitor.report()
+        report.insert(0, 'problem_size', problem_size)
+        reports.append(report)
+    if reports:
+        output_file = os.path.join(os.getcwd(), "StatsResults", "ImageAnalysis_Sequential.csv")
+        pd.concat(reports, ignore_index=True).to_csv(output_file, index=False)
+        print(f"Saved to: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,53 @@
 import os
+import time
 import base64
 import pandas as pd
 from dotenv import load_dotenv
 from openai import OpenAI
+from voting import sequential_vote, vote_record
+from rubrics import RUBRIC
+from label_schema import openai_chat_format, openai_chat_usage, parse_label
+from results_log import default_log_path, append_result, completed_keys, result_key, materialize_predictions
 # This script classifies the size of a problem from an image using GPT-4o
 # It encodes the image as a base64 string and sends it to the OpenAI API
 # The classification is based on a predefined prompt that defines the problem sizes
 # Change the problem variable to "glitch", "bummer", or "disaster" as needed
 # The script reads images from a specified directory, classifies them, and saves the results to a CSV file
+# Each prediction is appended to the results log as it arrives; reruns skip images that are already classified
+# The answer is constrained to the three labels by a JSON schema, and token usage and latency are logged per call
 
 # Load all the keys from the .env file 
 load_dotenv()
 
+MODEL = "gpt-4o"
+
+# Sequential self-consistency voting (see voting.py); samples are drawn at VOTE_TEMPERATURE
+VOTE_CONFIDENCE = 0.9
+VOTE_MAX_CALLS = 7
+VOTE_TEMPERATURE = 1.0
+
 PROMPT = """
 You will view an image telling a short story about a child aged 5 to 18 experiencing a social problem. 
 Identify the major problem in the story and classify the size of the problem into one of three categories based on the definitions and guideline below.
 
-Problem size guide: 
-A disaster is defined as a large-size problem for the child. These problems can pose serious risks to personal health and safety, cause the loss of lives of close friends or family members, or cause large financial loss. These problems typically require significant help from others and take a long time to recover.
-Examples of disasters are natural disasters, car accidents, house fires, deaths of close family members, major illnesses where recovery is uncertain, and the loss of life-long savings.
-Therefore, if a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
-
-A bummer is defined as a medium-size problem for the child. These problems can't be quickly fixed, lack a working backup solution, and have some non-transitory impact. The child needs effort or help from others to solve it over time.
-Examples of bummers are major disappointments in competitions, performances, tests, social challenges in long-term relationships, and non-life-threatening illnesses that take time to heal. Suppose a child forgets to bring their favorite pair of goggles to a major swim competition and NO backup goggles are available. In that case, their performance will be severely impacted, and the problem size will fall into the bummer category.
-If a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
-
-A glitch is defined as a small problem for the child. These problems do not pose a risk to health or safety and can be quickly fixed or with a reasonable backup solution.
-Examples of glitches are occasional minor disagreements with friends, a bad hair day, or a small mistake on a test or practice, which will not impact the child's overall performance.
-For example, if a child forgets to bring their favorite pair of goggles to a major swim competition, but there IS a backup goggle available, the problem size is a glitch. This is because the child can still perform reasonably while wearing the backup goggles.
-If a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
-
-There should be no overlap between the three categories, i.e., if a problem fits the definition of one category, it should not fit the definition of another category.
-Return only one word — “disaster”, “bummer”, or “glitch” — in lowercase.
-Do not include any explanation or extra text/symbols such as quotation marks.
-"""
+""" + RUBRIC
 
 def encode_image(image_path: str) -> str:
     """Encode image as base64 string for OpenAI API"""
     with open(image_path, "rb") as f:
         return base64.b64encode(f.read()).decode("utf-8")
 
-def predict_problem_size(client: OpenAI, image_path: str) -> str:
-    """Use GPT-4o to classify the size of the problem from an image"""
-    base64_image = encode_image(image_path)
+def predict_problem_size(client: OpenAI, image_path: str, temperature: float = None, base64_image: str = None,
+                         prompt: str = PROMPT) -> tuple:
+    """Use GPT-4o to classify the size of the problem from an image; returns the label and the call's usage"""
+    if base64_image is None:
+        base64_image = encode_image(image_path)
+    extra = {} if temperature is None else {"temperature": temperature}
+    start = time.perf_counter()
     response = client.chat.completions.create(
-        model="gpt-4o",
+        model=MODEL,
         messages=[
-            {"role": "system", "content": PROMPT},
+            {"role": "system", "content": prompt},
             {"role": "user", "content": [
                 {"type": "text", "text": "Here is the image."},
                 {"type": "image_url", "image_url": {
@@ -54,13 +55,16 @@ def predict_problem_size(client: OpenAI, image_path: str) -> str:
                 }},
             ]}
         ],
-        max_tokens=10
+        max_tokens=20,
+        response_format=openai_chat_format(),
+        **extra
     )
-    return response.choices[0].message.content.strip().lower()
+    return parse_label(response.choices[0].message.content), openai_chat_usage(response, time.perf_counter() - start)
 
-def main():
+def main(problem=None):
     # Paths
-    problem= "disaster" #change this to glitch/bummer/disaster as needed
+    problem= problem or "disaster" #change this to glitch/bummer/disaster as needed (or: python ssg.py classify --problem)
+    voting= False #set to True to sample until the majority label is statistically stable
     problem_c= problem.capitalize()
     image_dir = os.path.join(os.getcwd(),f"{problem_c}Folder")
  
@@ -68,6 +72,8 @@ def main():
     #output_file = os.path.join(image_dir, "Stats_summary_bummer_combined_cgpt_classify_image_1.csv")
     input_file=os.path.join(image_dir,f"Stats_summary_{problem}_combined.csv")
     output_file=f"PE_Stats_summary_{problem}_combined_cgpt_classify_image.csv"
+    log_file = default_log_path()
+    done = completed_keys(log_file)
     df = pd.read_csv(input_file)
 
     # Clean column names
@@ -90,19 +96,36 @@ def main():
         tool = row["Image_Tool"]
         scenario = row["scenario"]  # Access the "scenario" column
         image_path = os.path.join(image_dir, f"scenario_{problem}_{scenario}_{tool}.png")
-        
+        if result_key(problem, scenario, tool, "image", MODEL) in done:
+            print(f"[Scenario {scenario}] Tool: {tool}, already classified, skipping")
+            continue
+
         if os.path.exists(image_path):
             try:
-                predicted_size = predict_problem_size(client, image_path).lower()
-                df.at[index, "Image Path"] = image_path
-                df.at[index, "Predicted Problem Size"] = predicted_size
-                print(f"[Scenario {scenario}] Tool: {tool}, Prediction: {predicted_size}")
+                record = {"problem_size": problem, "scenario": int(scenario), "tool": tool,
+                          "modality": "image", "model": MODEL, "path": image_path}
+                if voting:
+                    # Encode once and reuse the image for every sample
+                    base64_image = encode_image(image_path)
+                    result = sequential_vote(
+                        lambda: predict_problem_size(client, image_path, VOTE_TEMPERATURE, base64_image),
+                        confidence=VOTE_CONFIDENCE, max_calls=VOTE_MAX_CALLS)
+                    predicted_size = result.label
+                    record.update(vote_record(result))
+                else:
+                    predicted_size, usage = predict_problem_size(client, image_path)
+                    record.update(usage)
+                record["prediction"] = predicted_size
+                append_result(log_file, record)
+                print(f"[Scenario {scenario}] Tool: {tool}, Prediction: {predicted_size}"
+                      + (f" ({result.calls} calls)" if voting else ""))
             except Exception as e:
                 print(f"[Scenario {scenario}] Tool: {tool}, Failed: {e}")
         else:
             print(f"[Scenario {scenario}] Tool: {tool}, Image not found: {image_path}")
 
-    # Save result
+    # Save result, materialized from the log so earlier runs are included
+    df = materialize_predictions(df, log_file, problem, "image", MODEL, tool_column="Image_Tool", path_column="Image Path")
     df.to_csv(output_file, index=False)
     print(f"Predictions saved to: {output_file}")
 
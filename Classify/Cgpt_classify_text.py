@@ -1,61 +1,69 @@
 import os
+import time
 import pandas as pd
 from dotenv import load_dotenv
 from openai import OpenAI
+from voting import sequential_vote, vote_record
+from rubrics import RUBRIC_FULL
+from label_schema import openai_responses_format, openai_responses_usage, parse_label
+from cascade_classifier import CascadeClassifier, MODEL_FILE
+from results_log import default_log_path, append_result, labels_by_script_hash, calls_by_script_hash
+from script_dedupe import HASH_COLUMN, add_script_hash, unique_scripts, fan_out
 
 # This script classifies the size of a problem from a script text using GPT-4o
 # The classification is based on a predefined prompt that defines the problem sizes
 # Change the problem variable to "glitch", "bummer", or "disaster" as needed
 # The script reads text from a specified directory, classifies them, and saves the results to a CSV file
+# Rows are grouped by a hash of the script, so each unique story is classified once whatever the row order
+# Optionally a local TF-IDF model answers confident stories first and only uncertain ones are sent to the API
+# Each prediction is appended to the results log as it arrives; reruns skip stories that are already classified
+# The answer is constrained to the three labels by a JSON schema, and token usage and latency are logged per call
 
 
 # Load all the keys from the .env file
 load_dotenv()
 
-PROMPT = """
-You will read a short story about a child aged 5 to 18 experiencing a social problem. 
-Identify the major problem in the story and classify the size of the problem into one of three categories based on the definitions and guideline below.
+MODEL = "gpt-4o"
 
-Problem size guide: 
-A disaster is defined as a large-size problem for the child. These problems can pose serious risks to personal health and safety, cause the loss of lives of close friends or family members, or cause large financial loss. These problems typically require significant help from others and take a long time to recover.
-Examples of disasters are natural disasters, car accidents, house fires, deaths of close family members, major illnesses where recovery is uncertain, and the loss of life-long savings.
-Therefore, if a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
+# Sequential self-consistency voting (see voting.py); samples are drawn at VOTE_TEMPERATURE
+VOTE_CONFIDENCE = 0.9
+VOTE_MAX_CALLS = 7
+VOTE_TEMPERATURE = 1.0
 
-A bummer is defined as a medium-size problem for the child. These problems can't be quickly fixed, lack a working backup solution, and have some non-transitory impact. The child needs effort or help from others to solve it over time.
-Examples of bummers are major disappointments in competitions, performances, tests, social challenges in long-term relationships, and non-life-threatening illnesses that take time to heal. Suppose a child forgets to bring their favorite pair of goggles to a major swim competition and NO backup goggles are available. In that case, their performance will be severely impacted, and the problem size will fall into the bummer category.
-If a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
+PROMPT = RUBRIC_FULL
 
-A glitch is defined as a small problem for the child. These problems do not pose a risk to health or safety and can be quickly fixed or with a reasonable backup solution.
-Examples of glitches are occasional minor disagreements with friends, a bad hair day, or a small mistake on a test or practice, which will not impact the child's overall performance.
-For example, if a child forgets to bring their favorite pair of goggles to a major swim competition, but there IS a backup goggle available, the problem size is a glitch. This is because the child can still perform reasonably while wearing the backup goggles.
-If a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
-
-There should be no overlap between the three categories, i.e., if a problem fits the definition of one category, it should not fit the definition of another category.
-Return only one word — “disaster”, “bummer”, or “glitch” — in lowercase.
-Do not include any explanation or extra text/symbols such as quotation marks.
-"""
-
-def predict_problem_size(client: OpenAI, story: str) -> str:
+def predict_problem_size(client: OpenAI, story: str, temperature: float = None, prompt: str = PROMPT) -> tuple:
     """
     Use ChatGPT to classify the size of the problem for a given story.
+    Returns the label and the token usage/latency of the call.
     """
+    extra = {} if temperature is None else {"temperature": temperature}
+    start = time.perf_counter()
     response = client.responses.create(
-        model="gpt-4o",
+        model=MODEL,
         input=[
-            {"role": "system", "content": PROMPT},
+            {"role": "system", "content": prompt},
             {"role": "user", "content": story},
         ],
+        text=openai_responses_format(),
+        **extra
     )
-    return response.output_text.strip().lower()
+    return parse_label(response.output_text), openai_responses_usage(response, time.perf_counter() - start)
 
-def main():
-    problem= "disaster" #change this to glitch/bummer/disaster as needed
+def main(problem=None):
+    problem= problem or "disaster" #change this to glitch/bummer/disaster as needed (or: python ssg.py classify --problem)
+    voting= False #set to True to sample until the majority label is statistically stable
+    use_cascade= False #set to True to answer confident stories with the local model (train it with cascade_classifier.py)
     problem_c= problem #.capitalize()
     image_dir = os.path.join(os.getcwd(),f"{problem_c.capitalize()}Folder")
     # Load the CSV file containing stories
     input_file=os.path.join(image_dir,f"Stats_summary_{problem}_combined.csv")
     output_file=f"PE_Stats_summary_{problem}_combined_cgpt_classify_text.csv"
+    log_file = default_log_path()
+    labels = labels_by_script_hash(log_file, "text", MODEL)
+    calls = calls_by_script_hash(log_file, "text", MODEL)
     df = pd.read_csv(input_file)
+    cascade = CascadeClassifier.load(os.path.join(os.getcwd(), "StatsResults", MODEL_FILE)) if use_cascade else None
 
     # Strip whitespace from column names
     df.columns = df.columns.str.strip()
@@ -73,18 +81,41 @@ def main():
         problem_size_index = df.columns.get_loc("Problem Size") + 1
         df.insert(problem_size_index, "Predicted Problem Size", "")  # Create the column if it doesn't exist
     
-    # Process every other row
-    processed_indices = []
-    for index in range(0, len(df), 2):  # Skip every other row
-        story = df.at[index, "Script"]  # Access the "Script" column
-        scenario = df.at[index, "scenario"]  # Access the "scenario" column
-        predicted_size = predict_problem_size(client, story)  # Predict problem size for each story
+    # Group rows by script content and classify each unique story once
+    df = add_script_hash(df)
+    stories = unique_scripts(df)
+    for _, row in stories.iterrows():
+        story = row["Script"]  # Access the "Script" column
+        scenario = row["scenario"]  # Access the "scenario" column
+        if row[HASH_COLUMN] in labels:
+            print(f"[Scenario {scenario}] already classified, skipping")
+            continue
+        record = {"problem_size": problem, "scenario": int(scenario), "tool": "",
+                  "modality": "text", "model": MODEL, "script_hash": row[HASH_COLUMN]}
+        local_size, confidence = cascade.predict_local(story, MODEL) if cascade else (None, None)
+        if local_size:
+            # Confident local answer; no API call
+            predicted_size = local_size
+            record.update({"tier": "local", "confidence": confidence})
+        elif voting:
+            result = sequential_vote(lambda: predict_problem_size(client, story, VOTE_TEMPERATURE),
+                                     confidence=VOTE_CONFIDENCE, max_calls=VOTE_MAX_CALLS)
+            predicted_size = result.label
+            record.update(vote_record(result))
+            calls[row[HASH_COLUMN]] = result.calls
+        else:
+            predicted_size, usage = predict_problem_size(client, story)  # Predict problem size for each story
+            record.update(usage)
         print(f"[Scenario {scenario}] Prediction: {predicted_size}")  # Output the prediction with scenario
-        df.at[index, "Predicted Problem Size"] = predicted_size  # Override or populate the column
-        processed_indices.append(index)  # Track processed rows
-
-    # Remove skipped rows
-    df = df.loc[processed_indices].reset_index(drop=True)
+        record["prediction"] = predicted_size
+        append_result(log_file, record)
+        labels[row[HASH_COLUMN]] = predicted_size
+
+    # Fan the labels out to every row sharing a story, then keep one row per story
+    df = fan_out(df, labels)
+    if calls:
+        df = fan_out(df, calls, column="Classification Calls")
+    df = unique_scripts(df).drop(columns=[HASH_COLUMN]).reset_index(drop=True)
 
     # Remove the "Image_Tool" column
     if "Image_Tool" in df.columns:
@@ -1,66 +1,74 @@
 import os
+import time
 import pandas as pd
 import google.generativeai as genai
 from dotenv import load_dotenv
+from voting import sequential_vote, vote_record
+from rubrics import RUBRIC
+from label_schema import gemini_generation_config, gemini_usage, parse_label
+from cascade_classifier import CascadeClassifier, MODEL_FILE
+from results_log import default_log_path, append_result, labels_by_script_hash, calls_by_script_hash
+from script_dedupe import HASH_COLUMN, add_script_hash, unique_scripts, fan_out
 
 # This script classifies the size of a problem from a text using Gemini
 # The classification is based on a predefined prompt that defines the problem sizes
 # Change the problem variable to "glitch", "bummer", or "disaster" as needed
 # The script reads text from a specified directory, classifies them, and saves the
+# Rows are grouped by a hash of the script, so each unique story is classified once whatever the row order
+# Optionally a local TF-IDF model answers confident stories first and only uncertain ones are sent to the API
+# Each prediction is appended to the results log as it arrives; reruns skip stories that are already classified
+# The answer is constrained to the three labels by an enum schema, and token usage and latency are logged per call
 
 
 # Load API key
 load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
+MODEL = "gemini-1.5-pro-latest"
+
+# Sequential self-consistency voting (see voting.py); samples are drawn at VOTE_TEMPERATURE
+VOTE_CONFIDENCE = 0.9
+VOTE_MAX_CALLS = 7
+VOTE_TEMPERATURE = 1.0
+
 PROMPT = """
 You will read a short story about a child experiencing a social problem. 
 Identify the main problem in the story and classify it into one of three categories based on its size.
 
-Problem size guide: 
-A disaster is defined as a large-size problem for the child. These problems can pose serious risks to personal health and safety, cause the loss of lives of close friends or family members, or cause large financial loss. These problems typically require significant help from others and take a long time to recover.
-Examples of disasters are natural disasters, car accidents, house fires, deaths of close family members, major illnesses where recovery is uncertain, and the loss of life-long savings.
-Therefore, if a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
-
-A bummer is defined as a medium-size problem for the child. These problems can't be quickly fixed, lack a working backup solution, and have some non-transitory impact. The child needs effort or help from others to solve it over time.
-Examples of bummers are major disappointments in competitions, performances, tests, social challenges in long-term relationships, and non-life-threatening illnesses that take time to heal. Suppose a child forgets to bring their favorite pair of goggles to a major swim competition and NO backup goggles are available. In that case, their performance will be severely impacted, and the problem size will fall into the bummer category.
-If a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
+""" + RUBRIC
 
-A glitch is defined as a small problem for the child. These problems do not pose a risk to health or safety and can be quickly fixed or with a reasonable backup solution.
-Examples of glitches are occasional minor disagreements with friends, a bad hair day, or a small mistake on a test or practice, which will not impact the child's overall performance.
-For example, if a child forgets to bring their favorite pair of goggles to a major swim competition, but there IS a backup goggle available, the problem size is a glitch. This is because the child can still perform reasonably while wearing the backup goggles.
-If a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
-
-There should be no overlap between the three categories, i.e., if a problem fits the definition of one category, it should not fit the definition of another category.
-Return only one word — “disaster”, “bummer”, or “glitch” — in lowercase.
-Do not include any explanation or extra text/symbols such as quotation marks.
-"""
-
-def classify_text(script_text):
-    """Classify the problem size based on the text using Gemini API."""
+def classify_text(script_text, temperature=None, prompt=PROMPT):
+    """Classify the problem size based on the text using Gemini API; returns the label and the call's usage."""
     try:
-        model = genai.GenerativeModel(model_name="gemini-1.5-pro-latest")
+        model = genai.GenerativeModel(model_name=MODEL)
+        start = time.perf_counter()
         response = model.generate_content([
-            {"text": PROMPT},  # System prompt
+            {"text": prompt},  # System prompt
             {"text": script_text}  # User input
-        ])
-        return response.text.strip().lower()
+        ], generation_config=gemini_generation_config(temperature))
+        return parse_label(response.text), gemini_usage(response, time.perf_counter() - start)
     except Exception as e:
         print(f"Error processing script: {e}")
-        return "Error"
+        return "Error", {}
 
-def main():
+def main(problem=None):
     # File paths
-    problem= "glitch" #change this to glitch/bummer/disaster as needed
+    problem= problem or "glitch" #change this to glitch/bummer/disaster as needed (or: python ssg.py classify --problem)
+    voting= False #set to True to sample until the majority label is statistically stable
+    use_cascade= False #set to True to answer confident stories with the local model (train it with cascade_classifier.py)
     problem_c= problem.capitalize()
     image_dir = os.path.join(os.getcwd(),f"{problem_c}Folder")
     # Load the CSV file containing stories
     input_csv=os.path.join(image_dir,f"Stats_summary_{problem}_combined.csv")
     output_csv=f"PE_Stats_summary_{problem}_combined_gemini_classify_text.csv"
+    log_file = default_log_path()
+    labels = labels_by_script_hash(log_file, "text", MODEL)
+    calls = calls_by_script_hash(log_file, "text", MODEL)
   
 
     # Read CSV
     df = pd.read_csv(input_csv)
+    cascade = CascadeClassifier.load(os.path.join(os.getcwd(), "StatsResults", MODEL_FILE)) if use_cascade else None
 
     # Clean column names
     df.columns = df.columns.str.strip()
@@ -72,28 +80,48 @@ def main():
     if "Predicted Problem Size" not in df.columns:
         df.insert(df.columns.get_loc("Problem Size") + 1, "Predicted Problem Size", "")
 
-    # Keep track of processed rows
-    processed_indices = []
-
-    # Loop through every other row in the original DataFrame
-    for index in range(1, len(df), 2):  # Skip every other row
-        row = df.iloc[index]  # Access the row using iloc
+    # Group rows by script content and classify each unique story once
+    df = add_script_hash(df)
+    stories = unique_scripts(df)
+    for _, row in stories.iterrows():
         script_text = row["Script"]  # Access the "Script" column
         scenario = row["scenario"]  # Access the "scenario" column
-        
-        if pd.notna(script_text):  # Ensure the script text is valid
-            try:
-                predicted_size = classify_text(script_text)  # Classify the text
-                df.at[index, "Predicted Problem Size"] = predicted_size
-                print(f"[Scenario {scenario}] Prediction: {predicted_size}")
-                processed_indices.append(index)  # Track the processed row
-            except Exception as e:
-                print(f"[Scenario {scenario}] Failed: {e}")
-        else:
-            print(f"[Scenario {scenario}] Script is empty or invalid.")
-
-    # Filter to only incliude processed rows
-    df = df.loc[processed_indices].reset_index(drop=True)
+        if row[HASH_COLUMN] in labels:
+            print(f"[Scenario {scenario}] already classified, skipping")
+            continue
+        try:
+            record = {"problem_size": problem, "scenario": int(scenario), "tool": "",
+                      "modality": "text", "model": MODEL, "script_hash": row[HASH_COLUMN]}
+            local_size, confidence = cascade.predict_local(script_text, MODEL) if cascade else (None, None)
+            if local_size:
+                # Confident local answer; no API call
+                predicted_size = local_size
+                record.update({"tier": "local", "confidence": confidence})
+            elif voting:
+                result = sequential_vote(lambda: classify_text(script_text, VOTE_TEMPERATURE),
+                                         confidence=VOTE_CONFIDENCE, max_calls=VOTE_MAX_CALLS)
+                predicted_size = result.label
+                record.update(vote_record(result))
+                calls[row[HASH_COLUMN]] = result.calls
+            else:
+                predicted_size, usage = classify_text(script_text)  # Classify the text
+                record.update(usage)
+            record["prediction"] = predicted_size
+            append_result(log_file, record)
+            labels[row[HASH_COLUMN]] = predicted_size
+            print(f"[Scenario {scenario}] Prediction: {predicted_size}")
+        except Exception as e:
+            print(f"[Scenario {scenario}] Failed: {e}")
+
+    # Rows without a script cannot be classified
+    for scenario in df.loc[df[HASH_COLUMN] == "", "scenario"]:
+        print(f"[Scenario {scenario}] Script is empty or invalid.")
+
+    # Fan the labels out to every row sharing a story, then keep one row per story
+    df = fan_out(df, labels)
+    if calls:
+        df = fan_out(df, calls, column="Classification Calls")
+    df = unique_scripts(df).drop(columns=[HASH_COLUMN]).reset_index(drop=True)
 
     # Remove the "Image_Tool" column if it exists
     if "Image_Tool" in df.columns:
@@ -3,72 +3,99 @@ import pandas as pd
 import time
 import google.generativeai as genai
 from dotenv import load_dotenv
+from video_surrogate import build_surrogate_parts, surrogate_size
+from voting import sequential_vote, vote_record
+from rubrics import RUBRIC
+from label_schema import gemini_generation_config, gemini_usage, parse_label
+from results_log import default_log_path, append_result, completed_keys, result_key, materialize_predictions
 # This script classifies the size of a problem from a video using Gemini
 # It encodes the video as a base64 string and sends it to the OpenAI API
 # The classification is based on a predefined prompt that defines the problem sizes
 # Change the problem variable to "glitch", "bummer", or "disaster" as needed
 # The script reads videos from a specified directory, classifies them, and saves the
+# Each prediction is appended to the results log as it arrives; reruns skip videos that are already classified
+# The answer is constrained to the three labels by an enum schema, and token usage and latency are logged per call
+# With use_surrogate=True the mp4 is not uploaded; its keyframes and voiceover transcript are sent inline instead
 
 # Load API key
 load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
+MODEL = "gemini-2.0-flash"
+
+# Sequential self-consistency voting (see voting.py); samples are drawn at VOTE_TEMPERATURE
+VOTE_CONFIDENCE = 0.9
+VOTE_MAX_CALLS = 7
+VOTE_TEMPERATURE = 1.0
+
 PROMPT = """
 You will view a video telling a short story about a child experiencing a social problem. 
 Identify the main problem in the story and classify it into one of three categories based on its size.
 
-Problem size guide: 
-A disaster is defined as a large-size problem for the child. These problems can pose serious risks to personal health and safety, cause the loss of lives of close friends or family members, or cause large financial loss. These problems typically require significant help from others and take a long time to recover.
-Examples of disasters are natural disasters, car accidents, house fires, deaths of close family members, major illnesses where recovery is uncertain, and the loss of life-long savings.
-Therefore, if a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
-
-A bummer is defined as a medium-size problem for the child. These problems can't be quickly fixed, lack a working backup solution, and have some non-transitory impact. The child needs effort or help from others to solve it over time.
-Examples of bummers are major disappointments in competitions, performances, tests, social challenges in long-term relationships, and non-life-threatening illnesses that take time to heal. Suppose a child forgets to bring their favorite pair of goggles to a major swim competition and NO backup goggles are available. In that case, their performance will be severely impacted, and the problem size will fall into the bummer category.
-If a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
+""" + RUBRIC
 
-A glitch is defined as a small problem for the child. These problems do not pose a risk to health or safety and can be quickly fixed or with a reasonable backup solution.
-Examples of glitches are occasional minor disagreements with friends, a bad hair day, or a small mistake on a test or practice, which will not impact the child's overall performance.
-For example, if a child forgets to bring their favorite pair of goggles to a major swim competition, but there IS a backup goggle available, the problem size is a glitch. This is because the child can still perform reasonably while wearing the backup goggles.
-If a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
+def upload_video(video_path):
+    """Upload the video file and wait for Gemini to process it."""
+    myfile = genai.upload_file(
+        path=video_path,
+        display_name=os.path.basename(video_path)
+    )
+    print(f"Uploaded file '{os.path.basename(video_path)}' as: {myfile.uri}")
 
-There should be no overlap between the three categories, i.e., if a problem fits the definition of one category, it should not fit the definition of another category.
-Return only one word — “disaster”, “bummer”, or “glitch” — in lowercase.
-Do not include any explanation or extra text/symbols such as quotation marks.
-"""
+    # Add a fixed delay to allow the file to process
+    print(f"Waiting for the file to process...")
+    time.sleep(5)  # Wait for 5 seconds (adjust if necessary)
+    return myfile
 
-def classify_video(video_path):
-    """Classify the problem size based on the video using Gemini API."""
+def classify_video(video_path, temperature=None, myfile=None, prompt=PROMPT):
+    """Classify the problem size based on the video using Gemini API; returns the label and the call's usage."""
     try:
-        # Upload the video file
-        myfile = genai.upload_file(
-            path=video_path,
-            display_name=os.path.basename(video_path)
-        )
-        print(f"Uploaded file '{os.path.basename(video_path)}' as: {myfile.uri}")
-
-        # Add a fixed delay to allow the file to process
-        print(f"Waiting for the file to process...")
-        time.sleep(5)  # Wait for 5 seconds (adjust if necessary)
+        # Voting passes an already uploaded file so each sample does not upload again
+        if myfile is None:
+            myfile = upload_video(video_path)
 
         # Use the file for classification
-        model = genai.GenerativeModel(model_name="gemini-2.0-flash")
+        model = genai.GenerativeModel(model_name=MODEL)
+        start = time.perf_counter()
         response = model.generate_content([
-            myfile, PROMPT
-        ])
-        return response.text.strip().lower()
+            myfile, prompt
+        ], generation_config=gemini_generation_config(temperature))
+        return parse_label(response.text), gemini_usage(response, time.perf_counter() - start)
     except Exception as e:
         print(f"Error processing {video_path}: {e}")
-        return "Error"
+        return "Error", {}
 
-def main():
+def classify_video_surrogate(video_path, transcript=None, audio_paths=None, temperature=None, parts=None, prompt=PROMPT):
+    """Classify the problem size from the video's keyframes and voiceover instead of the full mp4."""
+    try:
+        # Each video is a still image plus a voiceover, so keyframes + transcript carry the same content
+        if parts is None:
+            parts = build_surrogate_parts(video_path, transcript=transcript, audio_paths=audio_paths)
+        print(f"Sending surrogate for '{os.path.basename(video_path)}': {len(parts) - 1} parts, "
+              f"{surrogate_size(parts) / 1024:.0f} KB (mp4: {os.path.getsize(video_path) / 1024:.0f} KB)")
+
+        # Inline parts need no upload and no processing delay
+        model = genai.GenerativeModel(model_name=MODEL)
+        start = time.perf_counter()
+        response = model.generate_content(parts + [prompt], generation_config=gemini_generation_config(temperature))
+        return parse_label(response.text), gemini_usage(response, time.perf_counter() - start)
+    except Exception as e:
+        print(f"Error processing {video_path}: {e}")
+        return "Error", {}
+
+def main(problem=None):
     # File paths
 
-    problem= "disaster" #change this to glitch/bummer/disaster as needed
+    problem= problem or "disaster" #change this to glitch/bummer/disaster as needed (or: python ssg.py classify --problem)
+    voting= False #set to True to sample until the majority label is statistically stable
+    use_surrogate= False #set to True to send keyframes + transcript instead of uploading the mp4
     problem_c= problem.capitalize()
     video_dir = os.path.join(os.getcwd(),f"{problem_c}Folder")
     # Load the CSV file containing stories
     input_csv=os.path.join(video_dir,f"Stats_summary_{problem}_combined.csv")
     output_csv=f"PE_Stats_summary_{problem}_combined_gemini_classify_video.csv"
+    log_file = default_log_path()
+    done = completed_keys(log_file)
 
   
     # Read CSV
@@ -88,19 +115,41 @@ def main():
         tool = row["Image_Tool"]
         scenario = row["scenario"]  # Access the "scenario" column
         video_path = os.path.join(video_dir, f"video_{problem}_{scenario}_{tool}.mp4")
-        
+        if result_key(problem, scenario, tool, "video", MODEL) in done:
+            print(f"[Scenario {scenario}] Tool: {tool}, already classified, skipping")
+            continue
+
         if os.path.exists(video_path):
             try:
-                predicted_size = classify_video(video_path)
-                df.at[index, "Video Path"] = video_path
-                df.at[index, "Predicted Problem Size"] = predicted_size
-                print(f"[Scenario {scenario}] Tool: {tool}, Prediction: {predicted_size}")
+                record = {"problem_size": problem, "scenario": int(scenario), "tool": tool,
+                          "modality": "video", "model": MODEL, "path": video_path}
+                if use_surrogate:
+                    # The generator does not keep per-scenario voiceover WAVs, so the script is the transcript
+                    parts = build_surrogate_parts(video_path, transcript=row["Script"])
+                    sample = lambda temperature=None: classify_video_surrogate(video_path, temperature=temperature, parts=parts)
+                else:
+                    # Upload once; every sample reuses the processed file
+                    myfile = upload_video(video_path)
+                    sample = lambda temperature=None: classify_video(video_path, temperature=temperature, myfile=myfile)
+                if voting:
+                    result = sequential_vote(lambda: sample(VOTE_TEMPERATURE),
+                                             confidence=VOTE_CONFIDENCE, max_calls=VOTE_MAX_CALLS)
+                    predicted_size = result.label
+                    record.update(vote_record(result))
+                else:
+                    predicted_size, usage = sample()
+                    record.update(usage)
+                record["prediction"] = predicted_size
+                append_result(log_file, record)
+                print(f"[Scenario {scenario}] Tool: {tool}, Prediction: {predicted_size}"
+                      + (f" ({result.calls} calls)" if voting else ""))
             except Exception as e:
                 print(f"[Scenario {scenario}] Tool: {tool}, Failed: {e}")
         else:
             print(f"[Scenario {scenario}] Tool: {tool}, Video not found: {video_path}")
 
-    # Save result
+    # Save result, materialized from the log so earlier runs are included
+    df = materialize_predictions(df, log_file, problem, "video", MODEL, tool_column="Image_Tool", path_column="Video Path")
     df.to_csv(output_csv, index=False)
     print(f"Predictions saved to: {output_csv}")
 
@@ -0,0 +1,197 @@
+import os
+import json
+import pickle
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.model_selection import StratifiedKFold, cross_val_predict, train_test_split
+from sklearn.metrics import confusion_matrix
+from script_dedupe import HASH_COLUMN, add_script_hash, script_hash
+
+# Local first tier for the text classifiers
+# A TF-IDF + logistic regression model is trained on the labeled stories in StatsResults/PE_Stats_summary_*_classify_text.csv.
+# Confident local predictions are used directly and only uncertain stories are escalated to predict_problem_size/classify_text.
+# Confidence thresholds are chosen on out-of-fold probabilities of one half of the stories, as the lowest confidence
+# (never below MIN_CONFIDENCE) at which the cascade is non-inferior to each API model within MARGIN, and the report
+# shows the accuracy and the fraction of API calls saved on the other, held-out half.
+# Stories the shipped model was trained on are always escalated, since its confidence on them is not honest.
+# Run this script from the repository root to (re)train the model and write the report.
+
+LABELS = ["glitch", "bummer", "disaster"]
+API_MODELS = {"cgpt": "gpt-4o", "gemini": "gemini-1.5-pro-latest"}
+MODEL_FILE = "cascade_text_model.pkl"
+REPORT_FILE = "cascade_text_report.csv"
+MARGIN = 0.02  # largest accuracy loss against the API model accepted (upper 95% bound)
+Z_ONE_SIDED = 1.645  # one-sided 95% normal quantile
+MIN_CONFIDENCE = 0.8  # stories below this local confidence always go to the API
+HOLDOUT = 0.5  # fraction of the stories kept out of the threshold search to report the savings on
+
+
+def load_training_data(input_dir: str) -> pd.DataFrame:
+    """One row per unique story: script, true problem size and the prediction of every API model"""
+    merged = None
+    for prefix in API_MODELS:
+        dfs = []
+        for problem in LABELS:
+            path = os.path.join(input_dir, f"PE_Stats_summary_{problem}_combined_{prefix}_classify_text.csv")
+            if os.path.exists(path):
+                dfs.append(pd.read_csv(path, usecols=["Problem Size", "Predicted Problem Size", "Script"]))
+        if not dfs:
+            continue
+        df = add_script_hash(pd.concat(dfs, ignore_index=True))
+        df = df[df[HASH_COLUMN] != ""].drop_duplicates(subset=HASH_COLUMN)
+        df["Problem Size"] = df["Problem Size"].str.strip().str.lower()
+        df = df.rename(columns={"Predicted Problem Size": f"pred_{prefix}"})
+        df[f"pred_{prefix}"] = df[f"pred_{prefix}"].astype(str).str.strip().str.lower()
+        if merged is None:
+            merged = df
+        else:
+            merged = merged.merge(df[[HASH_COLUMN, f"pred_{prefix}"]], on=HASH_COLUMN, how="outer")
+    if merged is None:
+        raise FileNotFoundError(f"No PE_Stats_summary_*_classify_text.csv files found in {input_dir}")
+    return merged.reset_index(drop=True)
+
+
+def build_model():
+    """TF-IDF features + logistic regression with sigmoid-calibrated probabilities"""
+    pipeline = make_pipeline(
+        TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, min_df=2),
+        LogisticRegression(C=10.0, max_iter=2000),
+    )
+    return CalibratedClassifierCV(pipeline, method="sigmoid", cv=5)
+
+
+def out_of_fold_proba(texts, y, folds: int = 5, seed: int = 0) -> np.ndarray:
+    """Calibrated class probabilities for every story from a model that never saw it (columns in LABELS order)"""
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+    proba = cross_val_predict(build_model(), texts, y, cv=cv, method="predict_proba")
+    classes = sorted(set(y))
+    return proba[:, [classes.index(label) for label in LABELS]]
+
+
+def calibrate_threshold(proba: np.ndarray, y, api_pred, margin: float = MARGIN, floor: float = MIN_CONFIDENCE) -> dict:
+    """Lowest confidence threshold (never below floor) at which the cascade is non-inferior to the API model alone:
+    the one-sided 95% upper bound of the accuracy lost by answering locally stays within margin"""
+    y = np.asarray(y)
+    api_correct = np.asarray(api_pred) == y
+    local_pred = np.asarray(LABELS)[proba.argmax(axis=1)]
+    local_correct = local_pred == y
+    confidence = proba.max(axis=1)
+    n = len(y)
+    api_accuracy = api_correct.mean()
+
+    # Sort by confidence; answering the top-k locally gives one paired accuracy loss (and its standard error) per k
+    order = np.argsort(-confidence, kind="stable")
+    lost = api_correct[order].astype(int) - local_correct[order].astype(int)
+    s1 = np.cumsum(lost)
+    s2 = np.cumsum(lost ** 2)
+    loss = s1 / n
+    se = np.sqrt(np.maximum(s2 - s1 ** 2 / n, 0) / (n - 1) / n)
+    upper = loss + Z_ONE_SIDED * se
+    # Only cut between distinct confidence values, since a threshold cannot split ties
+    distinct = np.r_[confidence[order][1:] < confidence[order][:-1], True]
+    ok = np.where((upper <= margin) & distinct & (confidence[order] >= floor))[0]
+    if len(ok) == 0:
+        return {"threshold": 1.0, "api_accuracy": float(api_accuracy), "cascade_accuracy": float(api_accuracy),
+                "loss_upper": 0.0, "saved": 0.0}
+    k = ok[-1]
+    return {
+        "threshold": float(confidence[order][k]),
+        "api_accuracy": float(api_accuracy),
+        "cascade_accuracy": float(api_accuracy - loss[k]),
+        "loss_upper": float(upper[k]),
+        "saved": float((k + 1) / n),
+    }
+
+
+def evaluate_threshold(proba: np.ndarray, y, api_pred, threshold: float) -> dict:
+    """Accuracy and API calls saved by the cascade at a fixed threshold"""
+    y = np.asarray(y)
+    api_pred = np.asarray(api_pred)
+    local = proba.max(axis=1) >= threshold
+    cascade_pred = np.where(local, np.asarray(LABELS)[proba.argmax(axis=1)], api_pred)
+    return {"api_accuracy": float((api_pred == y).mean()), "cascade_accuracy": float((cascade_pred == y).mean()),
+            "saved": float(local.mean()), "cascade_pred": cascade_pred}
+
+
+class CascadeClassifier:
+    """Local first tier: returns a label when confident enough for the given API model, otherwise None"""
+
+    def __init__(self, model, thresholds: dict, trained: set = frozenset()):
+        self.model = model
+        self.thresholds = thresholds
+        self.trained = set(trained)  # script hashes of the training stories
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "rb") as f:
+            saved = pickle.load(f)
+        return cls(saved["model"], saved["thresholds"], saved.get("trained", ()))
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            pickle.dump({"model": self.model, "thresholds": self.thresholds, "trained": self.trained}, f)
+
+    def predict_local(self, story: str, api_model: str):
+        """(label, confidence) if the local tier is confident for this API model, else (None, confidence);
+        stories the model was trained on are always escalated"""
+        if script_hash(story) in self.trained:
+            return None, None
+        proba = self.model.predict_proba([story])[0]
+        index = int(np.argmax(proba))
+        confidence = float(proba[index])
+        threshold = max(self.thresholds.get(api_model, 1.0), MIN_CONFIDENCE)
+        if confidence >= threshold:
+            return str(self.model.classes_[index]), confidence
+        return None, confidence
+
+
+def main():
+    input_dir = os.path.join(os.getcwd(), "StatsResults")
+    data = load_training_data(input_dir)
+    texts = data["Script"].tolist()
+    y = data["Problem Size"].to_numpy()
+    print(f"Training on {len(data)} unique labeled stories")
+
+    proba = out_of_fold_proba(texts, y)
+    local_pred = np.asarray(LABELS)[proba.argmax(axis=1)]
+    print(f"Local tier alone (out-of-fold) accuracy: {(local_pred == y).mean():.3f}")
+
+    # Choose the thresholds on one half of the stories and report the cascade on the other half
+    search, holdout = train_test_split(np.arange(len(y)), test_size=HOLDOUT, stratify=y, random_state=0)
+    rows = []
+    thresholds = {}
+    for prefix, api_model in API_MODELS.items():
+        column = f"pred_{prefix}"
+        if column not in data.columns:
+            continue
+        valid = data[column].notna().to_numpy() & (data[column] != "nan").to_numpy()
+        fit, test = search[valid[search]], holdout[valid[holdout]]
+        chosen = calibrate_threshold(proba[fit], y[fit], data[column].to_numpy()[fit])
+        thresholds[api_model] = chosen["threshold"]
+        result = evaluate_threshold(proba[test], y[test], data[column].to_numpy()[test], chosen["threshold"])
+
+        # Held-out confusion matrix of the cascade, to compare with the ConfusionMatrix_Text_* results
+        cm = confusion_matrix(y[test], result.pop("cascade_pred"), labels=LABELS)
+        print(f"{api_model}: threshold {chosen['threshold']:.3f} (search half: API accuracy {chosen['api_accuracy']:.3f}, "
+              f"cascade {chosen['cascade_accuracy']:.3f}, loss upper bound {chosen['loss_upper']:.3f}); held-out half: "
+              f"API accuracy {result['api_accuracy']:.3f}, cascade accuracy {result['cascade_accuracy']:.3f}, "
+              f"API calls saved {result['saved']:.1%}")
+        print(cm)
+        rows.append({"api_model": api_model, "n_search": len(fit), "n_holdout": len(test), "threshold": chosen["threshold"],
+                     "search_saved": chosen["saved"], "search_loss_upper": chosen["loss_upper"], **result,
+                     "confusion_matrix": json.dumps(cm.tolist())})
+
+    # Fit the final model on all stories; the classifiers escalate these stories rather than answer them locally
+    model = build_model().fit(texts, y)
+    CascadeClassifier(model, thresholds, set(data[HASH_COLUMN])).save(os.path.join(input_dir, MODEL_FILE))
+    pd.DataFrame(rows).to_csv(os.path.join(input_dir, REPORT_FILE), index=False)
+    print(f"Model saved to: {os.path.join(input_dir, MODEL_FILE)}")
+    print(f"Report saved to: {os.path.join(input_dir, REPORT_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
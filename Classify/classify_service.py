@@ -0,0 +1,229 @@
+import sys
+import json
+import hashlib
+import argparse
+import threading
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from results_log import default_log_path, append_result, read_results
+
+# Resident classification service
+# A long-running local daemon that imports the classifiers once, keeps a warm (connection-pooled) OpenAI
+# client and the Gemini configuration, and holds a result cache in memory (seeded from the results log).
+# Jobs are posted as JSON to http://127.0.0.1:8765/classify and results are streamed back as JSON lines
+# in completion order, so scripts can classify with milliseconds of overhead instead of interpreter startup.
+#
+#   python Classify/classify_service.py                     # start the daemon (from the repository root)
+#   classify_remote([{"classifier": "cgpt_text", "text": "..."}])  # from any script
+#
+# Job fields: classifier (cgpt_text, cgpt_image, gemini_text, gemini_image, gemini_video), text or path,
+# optional surrogate (gemini_video), and optional problem_size/scenario/tool to key the results log.
+
+HOST = "127.0.0.1"
+PORT = 8765
+CLASSIFIERS = {
+    "cgpt_text": ("Cgpt_classify_text", "text"),
+    "cgpt_image": ("Cgpt_classify_image", "image"),
+    "gemini_text": ("Gemini_classify_text", "text"),
+    "gemini_image": ("Gemini_classify_image", "image"),
+    "gemini_video": ("Gemini_classify_video", "video"),
+}
+
+
+def content_hash(job: dict) -> str:
+    """Script hash for text jobs (same as the text classifiers), file content hash otherwise"""
+    if "text" in job:
+        from script_dedupe import script_hash
+        return script_hash(job["text"])
+    with open(job["path"], "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class ClassificationService:
+    """Warm classifier modules, shared clients and an in-memory result cache"""
+
+    def __init__(self, log_path: str, workers: int = 8):
+        self.log_path = log_path
+        self.modules = {}
+        self.clients = {}
+        self.cache = {}
+        self.inflight = {}  # cache key -> Future of the job classifying it right now
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        # Seed the cache with every usable prediction already in the log
+        for r in read_results(log_path):
+            key = r.get("script_hash") or r.get("content_hash")
+            if key and not r.get("rubric") and r.get("prediction") not in (None, "", "Error"):
+                self.cache[(r.get("model"), r.get("modality"), key, bool(r.get("surrogate")))] = r["prediction"]
+
+    def module(self, classifier: str):
+        with self.lock:
+            if classifier not in self.modules:
+                self.modules[classifier] = __import__(CLASSIFIERS[classifier][0])
+            return self.modules[classifier]
+
+    def openai_client(self):
+        with self.lock:
+            if "openai" not in self.clients:
+                from openai import OpenAI
+                self.clients["openai"] = OpenAI()
+            return self.clients["openai"]
+
+    def warm(self) -> None:
+        """Import every classifier and build the clients up front"""
+        for classifier in CLASSIFIERS:
+            self.module(classifier)
+        self.openai_client()
+
+    def call(self, classifier: str, job: dict):
+        module = self.module(classifier)
+        if classifier == "cgpt_text":
+            return module.predict_problem_size(self.openai_client(), job["text"])
+        if classifier == "cgpt_image":
+            return module.predict_problem_size(self.openai_client(), job["path"])
+        if classifier == "gemini_text":
+            return module.classify_text(job["text"])
+        if classifier == "gemini_image":
+            return module.classify_image(job["path"])
+        if job.get("surrogate"):
+            return module.classify_video_surrogate(job["path"], transcript=job.get("transcript"))
+        return module.classify_video(job["path"])
+
+    def classify(self, job: dict) -> dict:
+        """Run one job, answering from the cache when the same content was classified before"""
+        classifier = job.get("classifier")
+        if classifier not in CLASSIFIERS:
+            return {"id": job.get("id"), "error": f"unknown classifier: {classifier}"}
+        module = self.module(classifier)
+        modality = CLASSIFIERS[classifier][1]
+        try:
+            key = content_hash(job)
+        except (KeyError, OSError) as e:
+            return {"id": job.get("id"), "error": f"bad job: {e}"}
+        # A keyframe surrogate answer is not a full-video answer, so the two are cached apart
+        surrogate = bool(job.get("surrogate")) and modality == "video"
+        cache_key = (module.MODEL, modality, key, surrogate)
+        # Only the first job for a content pays for the call; jobs for the same content wait for its answer
+        with self.lock:
+            if cache_key in self.cache:
+                return {"id": job.get("id"), "prediction": self.cache[cache_key], "cached": True}
+            pending = self.inflight.get(cache_key)
+            first = pending is None
+            if first:
+                pending = self.inflight[cache_key] = Future()
+        if not first:
+            return {"id": job.get("id"), "prediction": pending.result(), "cached": True}
+
+        try:
+            label, usage = self.call(classifier, job)
+            record = {"problem_size": job.get("problem_size", ""), "scenario": job.get("scenario", ""),
+                      "tool": job.get("tool", ""), "modality": modality, "model": module.MODEL,
+                      "prediction": label, "source": "service", **usage}
+            record["script_hash" if modality == "text" else "content_hash"] = key
+            if modality == "video":
+                record["surrogate"] = surrogate
+            if "path" in job:
+                record["path"] = job["path"]
+            append_result(self.log_path, record)
+        except Exception as e:
+            with self.lock:
+                del self.inflight[cache_key]
+            pending.set_exception(e)
+            raise
+        with self.lock:
+            if label != "Error":
+                self.cache[cache_key] = label
+            del self.inflight[cache_key]
+        pending.set_result(label)
+        return {"id": job.get("id"), "prediction": label, "cached": False, **usage}
+
+    def run(self, jobs: list):
+        """Yield results in completion order"""
+        futures = {self.pool.submit(self.classify, job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"id": jobs[futures[future]].get("id"), "error": str(e)}
+            result.setdefault("index", futures[future])
+            yield result
+
+
+def make_handler(service: ClassificationService):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path != "/health":
+                self.send_error(404)
+                return
+            body = json.dumps({"status": "ok", "cached": len(service.cache), "loaded": sorted(service.modules)}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path != "/classify":
+                self.send_error(404)
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                jobs = payload["jobs"] if isinstance(payload, dict) else payload
+            except (ValueError, KeyError) as e:
+                self.send_error(400, f"invalid request: {e}")
+                return
+            # Stream one JSON line per finished job using chunked transfer encoding
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for result in service.run(jobs):
+                line = (json.dumps(result) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def classify_remote(jobs: list, url: str = f"http://{HOST}:{PORT}/classify", timeout: float = 600):
+    """Send jobs to a running service and yield each result as soon as it is streamed back"""
+    request = urllib.request.Request(url, data=json.dumps({"jobs": jobs}).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        for line in response:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resident classification service")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=8, help="concurrent provider calls")
+    parser.add_argument("--no-warm", action="store_true", help="import classifiers on first use instead of at startup")
+    args = parser.parse_args(argv)
+
+    service = ClassificationService(default_log_path(), workers=args.workers)
+    if not args.no_warm:
+        service.warm()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Classification service on http://{args.host}:{args.port} ({len(service.cache)} cached results)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.pool.shutdown(wait=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import re
+import json
+
+# Constrained label output and usage accounting for the classifiers
+# The models are asked for one of three labels through a schema instead of free text: both OpenAI and Gemini
+# return a JSON object {"label": ...} whose value is restricted to the label enum, and every call reports
+# its input, output and cached tokens plus latency so they can be written to the results log.
+
+LABELS = ["glitch", "bummer", "disaster"]
+
+OPENAI_SCHEMA = {
+    "name": "problem_size",
+    "schema": {
+        "type": "object",
+        "properties": {
+            "label": {"type": "string", "enum": LABELS},
+        },
+        "required": ["label"],
+        "additionalProperties": False,
+    },
+    "strict": True,
+}
+
+
+def openai_chat_format() -> dict:
+    """response_format for client.chat.completions.create"""
+    return {"type": "json_schema", "json_schema": OPENAI_SCHEMA}
+
+
+def openai_responses_format() -> dict:
+    """text= argument for client.responses.create"""
+    return {"format": {"type": "json_schema", **OPENAI_SCHEMA}}
+
+
+def gemini_generation_config(temperature: float = None) -> dict:
+    """generation_config restricting Gemini to {"label": one of the labels}"""
+    config = {"response_mime_type": "application/json",
+              "response_schema": {"type": "object", "properties": {"label": {"type": "string", "enum": LABELS}},
+                                  "required": ["label"]}}
+    if temperature is not None:
+        config["temperature"] = temperature
+    return config
+
+
+def parse_label(text: str) -> str:
+    """Label from a constrained (or free text) answer; "Error" when no valid label is found"""
+    if text is None:
+        return "Error"
+    text = text.strip()
+    try:
+        value = json.loads(text)
+        if isinstance(value, dict):
+            value = value.get("label", "")
+        text = str(value)
+    except (json.JSONDecodeError, TypeError):
+        pass
+    words = re.findall(r"[a-z]+", text.lower())
+    found = [w for w in words if w in LABELS]
+    # Exactly one distinct label, otherwise the answer is ambiguous
+    if len(set(found)) == 1:
+        return found[0]
+    return "Error"
+
+
+def openai_chat_usage(response, latency: float) -> dict:
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "input_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+        "latency": round(latency, 4),
+    }
+
+
+def openai_responses_usage(response, latency: float) -> dict:
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "input_tokens_details", None)
+    return {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+        "latency": round(latency, 4),
+    }
+
+
+def gemini_usage(response, latency: float) -> dict:
+    usage = getattr(response, "usage_metadata", None)
+    return {
+        "input_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+        "output_tokens": getattr(usage, "candidates_token_count", 0) or 0,
+        "cached_tokens": getattr(usage, "cached_content_token_count", 0) or 0,
+        "latency": round(latency, 4),
+    }
+
+
+def add_usage(total: dict, usage: dict) -> dict:
+    """Sum the usage of several calls (e.g. the samples of one vote)"""
+    total = dict(total)
+    for key, value in (usage or {}).items():
+        total[key] = round(total.get(key, 0) + value, 4)
+    return total
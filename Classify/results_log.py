@@ -0,0 +1,113 @@
+import os
+import json
+import time
+
+# Append-only results log shared by the classifiers
+# Every prediction is appended to a JSONL file as soon as it arrives (flushed and fsynced),
+# so a crash only loses the call in flight. Reruns skip (problem size, scenario, tool, modality, model)
+# keys that are already in the log, and the PE_Stats_summary_* CSVs are materialized from it.
+
+LOG_FILE = "classification_log.jsonl"
+
+
+def default_log_path() -> str:
+    """The log sits next to the PE_Stats_summary_* CSVs written by the classifiers"""
+    return os.path.join(os.getcwd(), LOG_FILE)
+
+
+def result_key(problem_size, scenario, tool, modality, model) -> tuple:
+    """Key identifying one classification; text has no image tool so tool is empty there"""
+    return (str(problem_size), str(scenario), str(tool or ""), str(modality), str(model))
+
+
+def append_result(log_path: str, record: dict) -> None:
+    """Append one prediction to the log and force it to disk"""
+    record = dict(record)
+    record.setdefault("timestamp", time.time())
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    with open(log_path, "a+b") as f:
+        # Start on a fresh line if the previous run crashed halfway through a record
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                line = b"\n" + line
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_results(log_path: str) -> list:
+    """Read all records; a line torn by a crash mid-write is skipped"""
+    records = []
+    if not os.path.exists(log_path):
+        return records
+    with open(log_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+def record_key(record: dict) -> tuple:
+    return result_key(record.get("problem_size"), record.get("scenario"), record.get("tool"),
+                      record.get("modality"), record.get("model"))
+
+
+def completed_keys(log_path: str) -> set:
+    """Keys that already have a usable prediction (failed calls are retried on the next run)"""
+    return {record_key(r) for r in read_results(log_path) if r.get("prediction") not in (None, "", "Error")}
+
+
+def latest_results(log_path: str, problem_size, modality, model) -> dict:
+    """Latest record per (scenario, tool) for one problem size, modality and model"""
+    latest = {}
+    for r in read_results(log_path):
+        key = record_key(r)
+        if key[0] == str(problem_size) and key[3] == str(modality) and key[4] == str(model):
+            latest[(key[1], key[2])] = r
+    return latest
+
+
+def labels_by_script_hash(log_path: str, modality, model) -> dict:
+    """Latest usable prediction per script content hash (text classifiers dedupe stories by hash)"""
+    labels = {}
+    for r in read_results(log_path):
+        # Records from the rubric benchmark used a different prompt
+        if str(r.get("modality")) == str(modality) and str(r.get("model")) == str(model) and r.get("script_hash") \
+                and not r.get("rubric"):
+            if r.get("prediction") not in (None, "", "Error"):
+                labels[r["script_hash"]] = r["prediction"]
+    return labels
+
+
+def calls_by_script_hash(log_path: str, modality, model) -> dict:
+    """Number of API calls spent per script content hash, for voted predictions"""
+    calls = {}
+    for r in read_results(log_path):
+        if str(r.get("modality")) == str(modality) and str(r.get("model")) == str(model) and "calls" in r \
+                and not r.get("rubric"):
+            calls[r.get("script_hash")] = r["calls"]
+    return calls
+
+
+def materialize_predictions(df, log_path: str, problem_size, modality, model, tool_column=None, path_column=None):
+    """Fill "Predicted Problem Size" (and the file path column) of the stats DataFrame from the log"""
+    latest = latest_results(log_path, problem_size, modality, model)
+    df = df.copy()
+    for index, row in df.iterrows():
+        tool = row[tool_column] if tool_column else ""
+        record = latest.get((str(row["scenario"]), str(tool or "")))
+        if record is None:
+            continue
+        df.at[index, "Predicted Problem Size"] = record.get("prediction", "")
+        if "calls" in record:
+            df.at[index, "Classification Calls"] = record["calls"]
+        if path_column and record.get("path"):
+            df.at[index, path_column] = record["path"]
+    return df
@@ -0,0 +1,204 @@
+import os
+import sys
+import time
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from rubrics import rubric_variants
+from label_schema import LABELS
+from cascade_classifier import load_training_data
+from results_log import default_log_path, append_result, read_results
+from script_dedupe import HASH_COLUMN
+
+# Prompt-compression benchmark for the problem-size rubric
+# Evaluates rubric variants (full, condensed, few-shot) against the labeled PE_Stats_summary_*_classify_text.csv
+# stories and reports input tokens, latency and accuracy deltas relative to the full rubric.
+# Providers:
+#   replay  - predictions recorded earlier (results log records tagged with the rubric; the full rubric
+#             falls back to the predictions already in the PE_Stats files). Nothing is sent to an API.
+#   standin - offline proxy that picks the label whose rubric section is most similar to the story, with
+#             latency simulated from the input tokens. It shows what a variant drops, not model quality.
+#   openai / gemini - live calls through the text classifiers; results are logged so they can be replayed.
+# Run from the repository root, e.g. python Classify/rubric_benchmark.py --provider standin
+
+STORY_HEADER_TOKENS = 8
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when installed, otherwise the ~4 characters per token rule of thumb"""
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding("o200k_base").encode(text))
+    except ImportError:
+        return max(1, round(len(text) / 4))
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+class ReplayProvider:
+    """Replays recorded predictions; returns None for stories without a recording"""
+
+    def __init__(self, data: pd.DataFrame, model: str, prefix: str, log_path: str):
+        self.name = f"replay:{model}"
+        self.recorded = {}
+        for r in read_results(log_path):
+            if r.get("model") == model and r.get("rubric") and r.get("script_hash"):
+                self.recorded[(r["rubric"], r["script_hash"])] = r
+        # The PE_Stats files are a recorded run of the full rubric
+        column = f"pred_{prefix}"
+        self.baseline = dict(zip(data[HASH_COLUMN], data[column])) if column in data.columns else {}
+
+    def classify(self, variant: str, prompt: str, story: str, script_hash: str):
+        r = self.recorded.get((prompt_hash(prompt), script_hash))
+        if r is not None:
+            return r["prediction"], {k: r.get(k, np.nan) for k in ["input_tokens", "output_tokens", "latency"]}
+        if variant == "full" and script_hash in self.baseline:
+            return self.baseline[script_hash], {"input_tokens": count_tokens(prompt + story), "latency": np.nan}
+        return None
+
+
+class StandInProvider:
+    """Offline proxy: label = rubric section most similar to the story"""
+
+    def __init__(self, stories: list, base_latency: float = 0.4, seconds_per_1k_tokens: float = 0.15):
+        self.name = "standin"
+        self.vectorizer = TfidfVectorizer(stop_words="english", sublinear_tf=True).fit(stories)
+        self.base_latency = base_latency
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+        self.sections = {}
+
+    def rubric_sections(self, prompt: str):
+        """Vectorize the lines of the rubric that describe exactly one label"""
+        key = prompt_hash(prompt)
+        if key not in self.sections:
+            text = {label: "" for label in LABELS}
+            for line in prompt.splitlines():
+                lower = line.lower()
+                found = [(lower.find(label), label) for label in LABELS if label in lower]
+                # Instructions listing all labels describe none of them
+                if found and len(found) < len(LABELS):
+                    text[min(found)[1]] += " " + line
+            self.sections[key] = self.vectorizer.transform([text[label] for label in LABELS])
+        return self.sections[key]
+
+    def classify(self, variant: str, prompt: str, story: str, script_hash: str):
+        similarity = cosine_similarity(self.vectorizer.transform([story]), self.rubric_sections(prompt))[0]
+        input_tokens = count_tokens(prompt) + count_tokens(story) + STORY_HEADER_TOKENS
+        latency = self.base_latency + self.seconds_per_1k_tokens * input_tokens / 1000
+        return LABELS[int(np.argmax(similarity))], {"input_tokens": input_tokens, "output_tokens": 1, "latency": latency}
+
+
+class LiveProvider:
+    """Calls the real classifier and records the result in the results log for later replay"""
+
+    def __init__(self, provider: str, log_path: str):
+        if provider == "openai":
+            from openai import OpenAI
+            import Cgpt_classify_text as classifier
+            client = OpenAI()
+            self.call = lambda story, prompt: classifier.predict_problem_size(client, story, prompt=prompt)
+        else:
+            import Gemini_classify_text as classifier
+            self.call = lambda story, prompt: classifier.classify_text(story, prompt=prompt)
+        self.model = classifier.MODEL
+        self.name = f"live:{self.model}"
+        self.log_path = log_path
+
+    def classify(self, variant: str, prompt: str, story: str, script_hash: str):
+        label, usage = self.call(story, prompt)
+        append_result(self.log_path, {"problem_size": "", "scenario": "", "tool": "", "modality": "text",
+                                      "model": self.model, "prediction": label, "script_hash": script_hash,
+                                      "rubric": prompt_hash(prompt), "rubric_variant": variant, **usage})
+        return label, usage
+
+
+def pick_examples(data: pd.DataFrame, per_label: int, seed: int = 0) -> pd.DataFrame:
+    """Few-shot examples, per_label stories of each size"""
+    if per_label <= 0:
+        return data.iloc[0:0]
+    per_label = min(per_label, int(data["Problem Size"].value_counts().min()))
+    return data.groupby("Problem Size").sample(n=per_label, random_state=seed)
+
+
+def run_benchmark(provider, data: pd.DataFrame, variants: dict) -> pd.DataFrame:
+    """Per-story results for every variant"""
+    rows = []
+    for name, prompt in variants.items():
+        for story, truth, script_hash in zip(data["Script"], data["Problem Size"], data[HASH_COLUMN]):
+            start = time.perf_counter()
+            result = provider.classify(name, prompt, story, script_hash)
+            if result is None:
+                continue
+            label, usage = result
+            rows.append({"variant": name, "script_hash": script_hash, "truth": truth, "prediction": label,
+                         "correct": label == truth, "prompt_tokens": count_tokens(prompt),
+                         "input_tokens": usage.get("input_tokens", np.nan),
+                         "latency": usage.get("latency", np.nan),
+                         "wall_time": time.perf_counter() - start})
+    return pd.DataFrame(rows)
+
+
+def summarize(results: pd.DataFrame, baseline: str = "full") -> pd.DataFrame:
+    """Accuracy, tokens and latency per variant, with deltas relative to the baseline variant"""
+    summary = results.groupby("variant", sort=False).agg(
+        n=("correct", "size"),
+        accuracy=("correct", "mean"),
+        prompt_tokens=("prompt_tokens", "first"),
+        mean_input_tokens=("input_tokens", "mean"),
+        mean_latency=("latency", "mean"),
+    ).reset_index()
+    if baseline in summary["variant"].values:
+        base = summary.set_index("variant").loc[baseline]
+        summary["accuracy_delta"] = summary["accuracy"] - base["accuracy"]
+        summary["input_tokens_delta_pct"] = 100 * (summary["mean_input_tokens"] / base["mean_input_tokens"] - 1)
+        summary["latency_delta_pct"] = 100 * (summary["mean_latency"] / base["mean_latency"] - 1)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark problem-size rubric variants")
+    parser.add_argument("--provider", choices=["replay", "standin", "openai", "gemini"], default="replay")
+    parser.add_argument("--replay-model", choices=["cgpt", "gemini"], default="cgpt",
+                        help="which recorded predictions the replay provider uses")
+    parser.add_argument("--examples", type=int, default=2, help="few-shot examples per label (0 disables few_shot)")
+    parser.add_argument("--limit", type=int, default=0, help="evaluate at most this many stories (0 = all)")
+    args = parser.parse_args(argv)
+
+    input_dir = os.path.join(os.getcwd(), "StatsResults")
+    data = load_training_data(input_dir)
+    examples = pick_examples(data, args.examples)
+    # Few-shot examples are left out of the evaluation set
+    data = data[~data[HASH_COLUMN].isin(examples[HASH_COLUMN])]
+    if args.limit:
+        data = data.sample(min(args.limit, len(data)), random_state=0)
+    variants = rubric_variants(list(zip(examples["Script"], examples["Problem Size"])))
+
+    log_file = default_log_path()
+    if args.provider == "replay":
+        model = {"cgpt": "gpt-4o", "gemini": "gemini-1.5-pro-latest"}[args.replay_model]
+        provider = ReplayProvider(data, model, args.replay_model, log_file)
+    elif args.provider == "standin":
+        provider = StandInProvider(data["Script"].tolist())
+    else:
+        provider = LiveProvider(args.provider, log_file)
+
+    results = run_benchmark(provider, data, variants)
+    if results.empty:
+        print("No results; nothing recorded for these variants yet")
+        return 1
+    summary = summarize(results)
+    output_file = os.path.join(input_dir, f"rubric_benchmark_{provider.name.replace(':', '_')}.csv")
+    summary.to_csv(output_file, index=False)
+    print(f"Provider: {provider.name}, stories: {len(data)}")
+    print(summary.to_string(index=False))
+    print(f"Summary saved to: {output_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+# Problem-size rubric shared by the classifier prompts, and its variants for the prompt-compression benchmark
+# (rubric_benchmark.py). RUBRIC is the problem size guide every classifier appends to its own opening lines;
+# "full" is the prompt used by Cgpt_classify_text.py; "condensed" keeps the same rules in far fewer tokens;
+# "few_shot" is the condensed rubric followed by labeled example stories.
+
+RUBRIC = """Problem size guide: 
+A disaster is defined as a large-size problem for the child. These problems can pose serious risks to personal health and safety, cause the loss of lives of close friends or family members, or cause large financial loss. These problems typically require significant help from others and take a long time to recover.
+Examples of disasters are natural disasters, car accidents, house fires, deaths of close family members, major illnesses where recovery is uncertain, and the loss of life-long savings.
+Therefore, if a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
+
+A bummer is defined as a medium-size problem for the child. These problems can't be quickly fixed, lack a working backup solution, and have some non-transitory impact. The child needs effort or help from others to solve it over time.
+Examples of bummers are major disappointments in competitions, performances, tests, social challenges in long-term relationships, and non-life-threatening illnesses that take time to heal. Suppose a child forgets to bring their favorite pair of goggles to a major swim competition and NO backup goggles are available. In that case, their performance will be severely impacted, and the problem size will fall into the bummer category.
+If a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
+
+A glitch is defined as a small problem for the child. These problems do not pose a risk to health or safety and can be quickly fixed or with a reasonable backup solution.
+Examples of glitches are occasional minor disagreements with friends, a bad hair day, or a small mistake on a test or practice, which will not impact the child's overall performance.
+For example, if a child forgets to bring their favorite pair of goggles to a major swim competition, but there IS a backup goggle available, the problem size is a glitch. This is because the child can still perform reasonably while wearing the backup goggles.
+If a child is hospitalized due to a major illness, if their safety is at risk, or if a natural disaster—including a fire, flood, or prolonged outage of power, water, or food—occurs, the problem size is a disaster.
+
+There should be no overlap between the three categories, i.e., if a problem fits the definition of one category, it should not fit the definition of another category.
+Answer with a JSON object {"label": ...} whose label is "disaster", "bummer", or "glitch", in lowercase.
+Do not include any explanation or extra text.
+"""
+
+RUBRIC_FULL = """
+You will read a short story about a child aged 5 to 18 experiencing a social problem. 
+Identify the major problem in the story and classify the size of the problem into one of three categories based on the definitions and guideline below.
+
+""" + RUBRIC
+
+RUBRIC_CONDENSED = """
+Classify the main problem in a short story about a child aged 5 to 18 as one of:
+disaster: serious risk to health or safety, death of a close friend or family member, natural disaster, fire, flood, prolonged outage of power, water or food, hospitalization for a major illness, or large financial loss. Needs significant help and a long recovery.
+bummer: cannot be quickly fixed and has no working backup; lasting impact, e.g. a major disappointment in a competition, performance or test, a social challenge in a long-term relationship, or a non-life-threatening illness that takes time to heal.
+glitch: no risk to health or safety and quickly fixed or a reasonable backup exists, e.g. a minor disagreement with friends, a bad hair day, or a small mistake that does not affect overall performance.
+Any safety risk, hospitalization or natural disaster is a disaster. The categories do not overlap.
+Answer with a JSON object {"label": ...} whose label is "disaster", "bummer", or "glitch", in lowercase.
+"""
+
+
+def few_shot_rubric(examples: list) -> str:
+    """Condensed rubric followed by (story, label) examples"""
+    lines = [RUBRIC_CONDENSED.rstrip(), "", "Examples:"]
+    for story, label in examples:
+        lines.append(f"Story: {story.strip()}")
+        lines.append(f'Answer: {{"label": "{label}"}}')
+    return "\n".join(lines) + "\n"
+
+
+def rubric_variants(examples: list = None) -> dict:
+    """All rubric variants by name; few_shot is only included when examples are given"""
+    variants = {"full": RUBRIC_FULL, "condensed": RUBRIC_CONDENSED}
+    if examples:
+        variants["few_shot"] = few_shot_rubric(examples)
+    return variants
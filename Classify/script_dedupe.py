@@ -0,0 +1,39 @@
+import hashlib
+import re
+import pandas as pd
+
+# Content-based dedupe for the text classifiers
+# The stats CSV has one row per (scenario, image tool), so every script appears once per tool.
+# Instead of assuming the copies sit in adjacent rows, rows are grouped by a hash of the script text,
+# each unique story is classified once and the label is fanned back out to every row sharing it.
+
+HASH_COLUMN = "Script Hash"
+
+
+def script_hash(text) -> str:
+    """SHA-256 of the script with whitespace normalized; empty string for missing scripts"""
+    if not isinstance(text, str) or not text.strip():
+        return ""
+    normalized = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def add_script_hash(df: pd.DataFrame, column: str = "Script") -> pd.DataFrame:
+    """Add the content hash column used to group rows sharing a story"""
+    df = df.copy()
+    df[HASH_COLUMN] = df[column].map(script_hash)
+    return df
+
+
+def unique_scripts(df: pd.DataFrame) -> pd.DataFrame:
+    """First row of every distinct story (rows without a script are left out), in file order"""
+    valid = df[df[HASH_COLUMN] != ""]
+    return valid.drop_duplicates(subset=HASH_COLUMN, keep="first")
+
+
+def fan_out(df: pd.DataFrame, labels: dict, column: str = "Predicted Problem Size") -> pd.DataFrame:
+    """Copy the label of each story to every row with the same script hash"""
+    df = df.copy()
+    mapped = df[HASH_COLUMN].map(labels)
+    df[column] = mapped.where(mapped.notna(), df[column]) if column in df.columns else mapped
+    return df
@@ -0,0 +1,78 @@
+import os
+import pandas as pd
+from results_log import default_log_path, read_results
+
+# Cost and throughput of the classifiers per model and modality, from the token usage and latency
+# that every classifier writes to the results log.
+# Run from the folder holding classification_log.jsonl (the repository root by default).
+
+# USD per 1M tokens (input, cached input, output); update when pricing changes
+PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gemini-1.5-pro-latest": (1.25, 0.3125, 5.00),
+    "gemini-2.0-flash": (0.10, 0.025, 0.40),
+}
+
+
+def estimate_cost(model: str, input_tokens, cached_tokens, output_tokens):
+    """Cost in USD; cached input tokens are billed at the cached rate"""
+    if model not in PRICES:
+        return float("nan")
+    price_in, price_cached, price_out = PRICES[model]
+    return ((input_tokens - cached_tokens) * price_in + cached_tokens * price_cached + output_tokens * price_out) / 1e6
+
+
+def summarize_usage(records: list) -> pd.DataFrame:
+    """One row per (model, modality): items, calls, tokens, latency, throughput and estimated cost"""
+    df = pd.DataFrame(records)
+    if df.empty:
+        return df
+    for column in ["input_tokens", "output_tokens", "cached_tokens", "latency"]:
+        if column not in df.columns:
+            df[column] = 0
+    if "calls" not in df.columns:
+        df["calls"] = 1
+    if "tier" not in df.columns:
+        df["tier"] = "api"
+    df[["input_tokens", "output_tokens", "cached_tokens", "latency"]] = \
+        df[["input_tokens", "output_tokens", "cached_tokens", "latency"]].fillna(0)
+    df["tier"] = df["tier"].fillna("api")
+    # Local cascade answers cost no API call
+    df["calls"] = df["calls"].fillna(1).where(df["tier"] != "local", 0)
+    df["latency"] = df["latency"].where(df["tier"] != "local")
+    df["invalid"] = df["prediction"].isin(["Error", ""]) | df["prediction"].isna()
+
+    summary = df.groupby(["model", "modality"]).agg(
+        items=("prediction", "size"),
+        invalid=("invalid", "sum"),
+        calls=("calls", "sum"),
+        input_tokens=("input_tokens", "sum"),
+        cached_tokens=("cached_tokens", "sum"),
+        output_tokens=("output_tokens", "sum"),
+        total_latency=("latency", "sum"),
+        mean_latency=("latency", "mean"),
+        p95_latency=("latency", lambda s: s.quantile(0.95)),
+    ).reset_index()
+    summary["calls_per_minute"] = 60 * summary["calls"] / summary["total_latency"].where(summary["total_latency"] > 0)
+    summary["cost_usd"] = [
+        estimate_cost(m, i, c, o) for m, i, c, o in
+        zip(summary["model"], summary["input_tokens"], summary["cached_tokens"], summary["output_tokens"])
+    ]
+    summary["cost_per_item_usd"] = summary["cost_usd"] / summary["items"]
+    return summary
+
+
+def main():
+    log_file = default_log_path()
+    summary = summarize_usage(read_results(log_file))
+    if summary.empty:
+        print(f"No records in {log_file}")
+        return
+    output_file = os.path.join(os.getcwd(), "StatsResults", "classification_usage_summary.csv")
+    summary.to_csv(output_file, index=False)
+    print(summary.to_string(index=False))
+    print(f"Summary saved to: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import cv2 as cv
+import numpy as np
+
+# Keyframe + transcript surrogate for the generated videos
+# Every video made by generate_video is one still image held for the length of a voiceover,
+# so sending the whole mp4 to Gemini makes it decode hundreds of identical frames.
+# This module decodes the video locally, keeps one frame per scene (scene-change detection on
+# small grayscale thumbnails) and pairs the frames with the voiceover (cached WAVs or the script text).
+
+
+def extract_keyframes(video_path: str, threshold: float = 12.0, step: int = 12, thumb_size: int = 64) -> list:
+    """Return the unique still frames of a video as BGR arrays (one per detected scene)"""
+    cap = cv.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {video_path}")
+    keyframes = []
+    last_thumb = None
+    index = 0
+    try:
+        # grab() advances the stream without converting the frame; only every step-th frame is retrieved
+        while cap.grab():
+            if index % step == 0:
+                ok, frame = cap.retrieve()
+                if not ok:
+                    break
+                gray = cv.cvtColor(frame, cv.COLOR_BGR2GRAY)
+                thumb = cv.resize(gray, (thumb_size, thumb_size), interpolation=cv.INTER_AREA).astype(np.float32)
+                # a new scene starts when the mean absolute difference to the last kept frame exceeds the threshold
+                if last_thumb is None or np.mean(np.abs(thumb - last_thumb)) > threshold:
+                    keyframes.append(frame)
+                    last_thumb = thumb
+            index += 1
+    finally:
+        cap.release()
+    return keyframes
+
+
+def encode_frame(frame, quality: int = 90) -> bytes:
+    """Encode a BGR frame as JPEG bytes"""
+    ok, buffer = cv.imencode(".jpg", frame, [cv.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Could not encode frame as JPEG")
+    return buffer.tobytes()
+
+
+def build_surrogate_parts(video_path: str, transcript: str = None, audio_paths: list = None) -> list:
+    """Build Gemini content parts (keyframes + voiceover audio or transcript) that stand in for the mp4"""
+    parts = [{"text": "The video has been reduced to its key frame(s) followed by its voiceover."}]
+    for frame in extract_keyframes(video_path):
+        parts.append({"mime_type": "image/jpeg", "data": encode_frame(frame)})
+    # Prefer the cached voiceover WAVs; fall back to the script text as the transcript
+    audio_paths = [p for p in (audio_paths or []) if os.path.exists(p)]
+    if audio_paths:
+        for path in audio_paths:
+            with open(path, "rb") as f:
+                parts.append({"mime_type": "audio/wav", "data": f.read()})
+    elif transcript:
+        parts.append({"text": f"Voiceover transcript: {transcript}"})
+    return parts
+
+
+def surrogate_size(parts: list) -> int:
+    """Total number of bytes sent for the surrogate parts"""
+    return sum(len(p["data"]) if "data" in p else len(p["text"].encode("utf-8")) for p in parts)
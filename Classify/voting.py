@@ -0,0 +1,71 @@
+import math
+from collections import Counter, namedtuple
+from label_schema import add_usage
+
+# Sequential self-consistency voting for the classifiers
+# Instead of resampling every item a fixed N times, samples are drawn one at a time and a
+# sequential probability ratio test (SPRT) decides when to stop. The first valid sample fixes the candidate
+# label; every later sample is tested for agreement with it (testing the majority of the same samples would
+# favour early acceptance):
+#   H0: a sample agrees with the candidate with probability p0 (the model is guessing among 3 labels)
+#   H1: a sample agrees with the candidate with probability p1 (the model is consistent)
+# Sampling stops as soon as H1 is accepted at the configured confidence. With the defaults one agreeing
+# sample adds log(0.95 / (1/3)) = 1.05 to the boundary of log(0.8 / 0.1) = 2.08, so a stable item costs
+# three calls (the candidate and two agreeing samples); ambiguous ones keep sampling, up to max_calls, and
+# then return the majority label as undecided.
+# sample() returns a label, or (label, usage) in which case the usage of all samples is summed.
+
+VoteResult = namedtuple("VoteResult", ["label", "calls", "decided", "votes", "usage"])
+
+
+def sprt_threshold(confidence: float = 0.9, power: float = 0.8) -> float:
+    """Upper SPRT boundary log((1 - beta) / alpha) for accepting the majority label"""
+    alpha = 1 - confidence
+    return math.log(power / alpha)
+
+
+def majority_llr(count: int, calls: int, p0: float, p1: float) -> float:
+    """Log-likelihood ratio of H1 vs H0 after `count` of `calls` tested samples agree with the candidate"""
+    return count * math.log(p1 / p0) + (calls - count) * math.log((1 - p1) / (1 - p0))
+
+
+def vote_record(result: VoteResult) -> dict:
+    """Fields stored in the results log for a voted prediction"""
+    return {"calls": result.calls, "decided": result.decided, "votes": result.votes, **result.usage}
+
+
+def sequential_vote(sample, confidence: float = 0.9, power: float = 0.8, p0: float = 1 / 3, p1: float = 0.95,
+                    max_calls: int = 7, invalid=("Error", "")) -> VoteResult:
+    """Call sample() until the SPRT accepts the label of the first valid sample or max_calls is reached"""
+    threshold = sprt_threshold(confidence, power)
+    step = math.log(p1 / p0)
+    votes = Counter()
+    usage = {}
+    calls = 0
+    candidate = None
+    tested = agree = 0
+    llr = 0.0
+    while calls < max_calls:
+        label = sample()
+        if isinstance(label, tuple):
+            label, call_usage = label
+            usage = add_usage(usage, call_usage)
+        calls += 1
+        # failed calls cost a call but do not vote
+        if label not in invalid:
+            votes[label] += 1
+            if candidate is None:
+                candidate = label
+            else:
+                tested += 1
+                agree += label == candidate
+                llr = majority_llr(agree, tested, p0, p1)
+                if llr >= threshold:
+                    return VoteResult(candidate, calls, True, dict(votes), usage)
+        # stop early when even agreeing remaining samples could not reach the boundary
+        if llr + (max_calls - calls - (candidate is None)) * step < threshold:
+            break
+    if not votes:
+        return VoteResult("Error", calls, False, {}, usage)
+    leader, _ = votes.most_common(1)[0]
+    return VoteResult(leader, calls, False, dict(votes), usage)
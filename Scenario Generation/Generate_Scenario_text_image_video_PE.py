@@ -6,6 +6,7 @@
 
 import json
 import os
+import sys
 import tempfile
 from time import time
 import pandas as pd
@@ -198,9 +199,9 @@ def add_row(filename,newlist):
         # Close the file object
         f_object.close()
 
-def main():
+def main(problem_size=None, n=None):
     #the problem size can be changed to disaster, bummer,or glitch. Each is run separately due to long processing time and unstability of DALLE3
-    problem_size="bummer" #.capitalize()
+    problem_size= problem_size or "bummer" #.capitalize() (or: python ssg.py generate --problem)
     stats_columns=["scenario","Image_Tool","Total_Time","Time_Script","Time_Image","Time_Voice","Time_Video","Problem Size", "setting","Script"]
     print(os.getcwd())
     #make folder
@@ -213,7 +214,19 @@ def main():
     #automatically read key from the env file
     client = OpenAI()
     #specifiy the number of scenarios to generate
-    n=100
+    n= n or 100
+    #score every saved image into the image feature store (Analysis/feature_store.py) as it is generated
+    score_features= False
+    #stop generating once the GPTimage vs DallE3 comparison is decided (group-sequential test, Analysis/sequential_monitor.py)
+    #the monitor reads the features from the feature store, so the images are scored into it as well
+    stop_when_decided= False
+    if score_features or stop_when_decided:
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Analysis"))
+        from feature_store import FeatureStore
+        feature_store = FeatureStore()
+    if stop_when_decided:
+        from sequential_monitor import SequentialMonitor
+        monitor = SequentialMonitor(max_n=n)
     #list of settings used to diversify the settings of the stories; if not used, GPT generates many duplicate scenarios on similar settings.
     setting_list=['volleyball', 'soccer','running', 'basketball','class', 'curling', 'lacrosse', 'singing', 'dancing', 'art', 'after school club', 'birthday party','tryout', 'game', 'field trip', 'swimming','ski','tennis','playing video game','vacation']
 
@@ -322,6 +335,18 @@ The generated script must meet OpenAI's content safety policy so it can later be
                 copy_file(image_url, image_path)
             else:
                 download_file(image_url, image_path)
+            if score_features or stop_when_decided:
+                feature_store.update([(problem_size, S_index, imagetool, image_path)], workers=1)
+
+        if stop_when_decided:
+            # The features the store has just computed for the two images of this scenario
+            stored = feature_store.query([problem_size], S_index)
+            scores = stored[stored['Scenario'] == S_index].set_index('Image Type')
+            monitor.add_images(scores.loc["GPTimage"], scores.loc["DallE3"])
+            if monitor.check():
+                monitor.report().to_csv(os.path.join(outputfolder, f"sequential_monitor_{problem_size}.csv"), index=False)
+                print(f"Comparison decided after {S_index} scenarios, stopping")
+                break
             
 
 
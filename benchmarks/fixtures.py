@@ -0,0 +1,93 @@
+import os
+import numpy as np
+import pandas as pd
+import cv2 as cv
+
+# Synthetic, seeded inputs for the benchmarks, so they run offline and without the generated scenarios:
+#   1024x1024 images with gradients, shapes, text and noise (scenario_{problem}_{s}_{tool}.png in {Problem}Folder)
+#   classification results in the PE_Stats_summary_{problem}_combined_{model}_classify_{modality}.csv layout
+#   ratings matrices (subjects x raters) with optional missing values
+
+PROBLEM_SIZES = ["glitch", "bummer", "disaster"]
+TOOLS = ["DallE3", "GPTimage"]
+MODELS = ["cgpt", "gemini"]
+MODALITIES = ["text", "image", "video"]
+
+
+def synthetic_image(seed: int, size: int = 1024) -> np.ndarray:
+    """BGR uint8 image with smooth regions, edges and texture, roughly like a generated illustration"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size] / size
+    img = np.stack([255 * (0.3 + 0.4 * x), 255 * (0.5 + 0.3 * np.sin(6 * y)), 255 * (0.6 - 0.4 * x * y)], axis=-1)
+    img = img.astype(np.uint8)
+    for _ in range(12):
+        center = tuple(int(c) for c in rng.integers(0, size, 2))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        if rng.random() < 0.5:
+            cv.circle(img, center, int(rng.integers(20, size // 6)), color, -1)
+        else:
+            cv.rectangle(img, center, tuple(int(c) for c in rng.integers(0, size, 2)), color, int(rng.integers(-1, 8)))
+    cv.putText(img, f"scene {seed}", (size // 10, size // 2), cv.FONT_HERSHEY_SIMPLEX, size / 400, (20, 20, 20), 3)
+    noise = rng.normal(0, 6, img.shape)
+    return np.clip(img + noise, 0, 255).astype(np.uint8)
+
+
+def write_images(root: str, scenarios: int = 2, size: int = 1024, problem_sizes: list = PROBLEM_SIZES) -> list:
+    """Writes the images of scenarios 1..scenarios of every problem size and tool; returns their paths"""
+    paths = []
+    for p, problem in enumerate(problem_sizes):
+        folder = os.path.join(root, f"{problem.capitalize()}Folder")
+        os.makedirs(folder, exist_ok=True)
+        for s in range(1, scenarios + 1):
+            for t, tool in enumerate(TOOLS):
+                path = os.path.join(folder, f"scenario_{problem}_{s}_{tool}.png")
+                if not os.path.exists(path):
+                    cv.imwrite(path, synthetic_image(1000 * p + 10 * s + t, size))
+                paths.append(path)
+    return paths
+
+
+def predictions(n_scenarios: int = 100, models: list = MODELS, accuracy: float = 0.8, seed: int = 0) -> pd.DataFrame:
+    """Rows like classification_metrics.load_predictions: every model classifies every item of every modality"""
+    rng = np.random.default_rng(seed)
+    items = []
+    for modality in MODALITIES:
+        tools = [""] if modality == "text" else TOOLS
+        for problem in PROBLEM_SIZES:
+            for tool in tools:
+                items.append(pd.DataFrame({"problem_size": problem, "modality": modality, "tool": tool,
+                                           "scenario": np.arange(1, n_scenarios + 1), "truth": problem}))
+    items = pd.concat(items, ignore_index=True)
+    rows = []
+    for model in models:
+        correct = rng.random(len(items)) < accuracy
+        other = rng.choice(PROBLEM_SIZES + ["error"], size=len(items), p=[0.32, 0.32, 0.32, 0.04])
+        rows.append(items.assign(model=model, prediction=np.where(correct, items["truth"], other)))
+    return pd.concat(rows, ignore_index=True)
+
+
+def write_predictions(input_dir: str, n_scenarios: int = 100, seed: int = 0) -> list:
+    """Writes the predictions as PE_Stats_summary_*_classify_*.csv files; returns their paths"""
+    os.makedirs(input_dir, exist_ok=True)
+    df = predictions(n_scenarios, seed=seed)
+    paths = []
+    for (problem, model, modality), group in df.groupby(["problem_size", "model", "modality"]):
+        out = pd.DataFrame({"scenario": group["scenario"]})
+        if modality != "text":
+            out["Image_Tool"] = group["tool"]
+        out["Problem Size"] = group["truth"]
+        out["Predicted Problem Size"] = group["prediction"]
+        out["Script"] = "A synthetic story."
+        path = os.path.join(input_dir, f"PE_Stats_summary_{problem}_combined_{model}_classify_{modality}.csv")
+        out.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def ratings(n_subjects: int = 600, n_raters: int = 4, missing: float = 0.0, seed: int = 0) -> np.ndarray:
+    """1-5 ratings sharing a subject effect, with rater bias and noise; missing ratings are NaN"""
+    rng = np.random.default_rng(seed)
+    scores = 3 + rng.normal(0, 1, (n_subjects, 1)) + rng.normal(0, 0.3, n_raters) + rng.normal(0, 0.6, (n_subjects, n_raters))
+    scores = np.clip(np.round(scores), 1, 5)
+    scores[rng.random(scores.shape) < missing] = np.nan
+    return scores
@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import time
+import fnmatch
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+import importlib.util
+import numpy as np
+
+# Micro-benchmarks of the analysis hot paths on synthetic fixtures (fixtures.py), so they run offline:
+#   features        MetricKernel / float64 reference metrics, BRISQUE, extract_paths on 1024x1024 PNGs
+#   classification  confusion matrices + precision/recall/F1, loading the PE_Stats CSVs
+#   power           exact binomial power grid, critical k, sample-size plan
+#   reliability     ICC table and Krippendorff's alpha with bootstrap CIs
+#   agreement       rating matrix join, Cohen's kappa with bootstrap CIs, the full agreement table
+# Every case is run once to warm up and then timed repeat times; the results (median, min, mean, stdev in
+# seconds per call) are written as JSON to benchmarks/results/. compare flags the cases that got slower:
+#   python benchmarks/run_benchmarks.py run [--quick] [--filter 'power.*']
+#   python benchmarks/run_benchmarks.py compare benchmarks/results/old.json benchmarks/results/new.json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ANALYSIS_DIR = os.path.join(ROOT, "Analysis")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+THRESHOLD = 0.10  # relative slow-down reported as a regression
+
+sys.path.insert(0, ANALYSIS_DIR)
+import fixtures  # noqa: E402  (benchmarks/ is on sys.path as the script folder)
+
+
+def load_script(name: str):
+    """Import an analysis script by file name (some have spaces in their names)"""
+    spec = importlib.util.spec_from_file_location(name.replace(" ", "_"), os.path.join(ANALYSIS_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def feature_cases(fixture_dir: str) -> list:
+    from image_features import (BRISQUE_MODEL, BRISQUE_RANGE, BrisqueScorer, MetricKernel, image_metrics,
+                                read_image, extract_paths)
+    paths = fixtures.write_images(fixture_dir, scenarios=1)[:4]
+    imgs = [read_image(path) for path in paths]
+    kernel = MetricKernel(0)
+    scorer = BrisqueScorer(os.path.join(ROOT, BRISQUE_MODEL), os.path.join(ROOT, BRISQUE_RANGE))
+    return [
+        ("features.metric_kernel", len(imgs), lambda: [kernel.metrics(img) for img in imgs]),
+        ("features.metric_kernel_levels2", len(imgs), lambda k=MetricKernel(2): [k.metrics(img) for img in imgs]),
+        ("features.image_metrics_reference", len(imgs), lambda: [image_metrics(img) for img in imgs]),
+        ("features.brisque", len(imgs), lambda: scorer.score_batch(imgs)),
+        ("features.extract_paths", len(paths), lambda: extract_paths(paths, workers=1)),
+    ]
+
+
+def classification_cases(fixture_dir: str) -> list:
+    from classification_metrics import confusion_matrices, metrics_report, load_predictions
+    df = fixtures.predictions(n_scenarios=1000)
+    slices, counts = confusion_matrices(df)
+    input_dir = os.path.join(fixture_dir, "StatsResults")
+    fixtures.write_predictions(input_dir, n_scenarios=100)
+    return [
+        ("classification.confusion_matrices", len(df), lambda: confusion_matrices(df)),
+        ("classification.metrics_report", len(slices), lambda: metrics_report(slices, counts)),
+        ("classification.load_predictions_csv", 3000, lambda: load_predictions(input_dir)),
+    ]
+
+
+def power_cases(fixture_dir: str) -> list:
+    power = load_script("Classification power")
+    p1 = np.linspace(0.4, 0.99, 60)
+    n = np.arange(10, 1001, 10)
+    accuracies = [0.96, 0.92, 0.86, 0.64, 0.84, 0.64, 0.91, 0.88]
+    alpha = [0.05, 0.01, power.bonferroni_alpha(accuracies)]
+    return [
+        ("power.power_grid", len(p1) * len(n) * len(alpha), lambda: power.power_grid(p1, n, alpha)),
+        ("power.find_critical_k", 2000, lambda: power.find_critical_k(np.arange(1, 2001), 1/3, 0.05)),
+        ("power.plan_sample_size", len(accuracies), lambda: power.plan_sample_size(accuracies, 1/3, alpha[2], 0.8)),
+    ]
+
+
+def reliability_cases(fixture_dir: str) -> list:
+    from reliability import icc_table, krippendorff_alpha
+    from resampling import bootstrap_indices, resample_weights
+    complete = fixtures.ratings(600, 4)
+    missing = fixtures.ratings(600, 4, missing=0.1, seed=1)
+    large = fixtures.ratings(5000, 50, missing=0.2, seed=2)
+    return [
+        ("reliability.icc_table", len(complete), lambda: icc_table(complete)),
+        ("reliability.krippendorff_alpha_bootstrap", len(missing),
+         lambda: krippendorff_alpha(missing, resample_weights(bootstrap_indices(len(missing))))),
+        ("reliability.krippendorff_alpha_5000x50", len(large), lambda: krippendorff_alpha(large)),
+    ]
+
+
+def agreement_cases(fixture_dir: str) -> list:
+    from agreement import rating_matrix, cohen_kappa, agreement_table
+    from resampling import bootstrap_indices, resample_weights
+    df = fixtures.predictions(n_scenarios=1000, models=["cgpt", "gemini", "claude"])
+    small = fixtures.predictions(n_scenarios=100, models=["cgpt", "gemini", "claude"])
+    _, _, categories, codes = rating_matrix(df)
+    pair = codes[:900, :2]
+    return [
+        ("agreement.rating_matrix", len(df), lambda: rating_matrix(df)),
+        ("agreement.cohen_kappa_bootstrap", len(pair),
+         lambda: cohen_kappa(pair[:, 0], pair[:, 1], len(categories), resample_weights(bootstrap_indices(len(pair))))),
+        ("agreement.agreement_table", len(small), lambda: agreement_table(small, B=1000)),
+    ]
+
+
+CASES = [feature_cases, classification_cases, power_cases, reliability_cases, agreement_cases]
+
+
+def measure(func, repeat: int) -> dict:
+    func()  # warm-up: imports, caches, allocation
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"median": statistics.median(times), "min": min(times), "mean": statistics.fmean(times),
+            "stdev": statistics.stdev(times) if len(times) > 1 else 0.0, "repeat": repeat}
+
+
+def metadata(quick: bool) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit, "python": platform.python_version(),
+            "numpy": np.__version__, "platform": platform.platform(), "cpu_count": os.cpu_count(), "quick": quick}
+
+
+def run(pattern: str = "*", repeat: int = 5, quick: bool = False, fixture_dir: str = None, log=print) -> dict:
+    """Times every case whose name matches pattern; returns {"meta": ..., "results": {name: timings}}"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        fixture_dir = fixture_dir or tmp
+        for group in CASES:
+            for name, items, func in group(fixture_dir):
+                if not fnmatch.fnmatch(name, pattern):
+                    continue
+                timing = measure(func, repeat)
+                timing["items"] = items
+                results[name] = timing
+                log(f"  {name:45s} {1000 * timing['median']:10.2f} ms (min {1000 * timing['min']:.2f}, n={items})")
+    return {"meta": metadata(quick), "results": results}
+
+
+def compare(base: dict, new: dict, threshold: float = THRESHOLD) -> list:
+    """(name, base median, new median, ratio, verdict) of every case in both runs; a case is a regression
+    (or improvement) when both its median and its minimum moved by more than threshold"""
+    rows = []
+    for name in sorted(set(base["results"]) & set(new["results"])):
+        b, n = base["results"][name], new["results"][name]
+        ratio = n["median"] / b["median"]
+        ratio_min = n["min"] / b["min"]
+        if ratio > 1 + threshold and ratio_min > 1 + threshold:
+            verdict = "REGRESSION"
+        elif ratio < 1 - threshold and ratio_min < 1 - threshold:
+            verdict = "faster"
+        else:
+            verdict = ""
+        rows.append((name, b["median"], n["median"], ratio, verdict))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the analysis hot paths")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("run", help="run the benchmarks and write the timings as JSON")
+    p.add_argument("--filter", default="*", help="only cases matching this pattern, e.g. 'power.*'")
+    p.add_argument("--repeat", type=int, default=5, help="timed calls per case")
+    p.add_argument("--quick", action="store_true", help="2 timed calls per case")
+    p.add_argument("--output", help="JSON file (default benchmarks/results/bench_<time>_<commit>.json)")
+    p = sub.add_parser("compare", help="compare two result files and flag regressions")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=THRESHOLD, help="relative slow-down counted as a regression")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        os.chdir(ROOT)  # the BRISQUE model files are looked up relative to the repository root
+        result = run(args.filter, 2 if args.quick else args.repeat, args.quick)
+        output = args.output or os.path.join(
+            RESULTS_DIR, f"bench_{time.strftime('%Y%m%d_%H%M%S')}_{result['meta']['commit'] or 'nogit'}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(result, f, indent=1)
+        print(f"{len(result['results'])} benchmarks saved to: {output}")
+        return 0
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    rows = compare(base, new, args.threshold)
+    print(f"{'benchmark':45s} {'base ms':>10s} {'new ms':>10s} {'ratio':>7s}")
+    for name, b, n, ratio, verdict in rows:
+        print(f"{name:45s} {1000 * b:10.2f} {1000 * n:10.2f} {ratio:7.2f} {verdict}")
+    regressions = [row for row in rows if row[4] == "REGRESSION"]
+    print(f"{len(regressions)} regression(s) above {args.threshold:.0%} "
+          f"({base['meta'].get('commit') or '?'} -> {new['meta'].get('commit') or '?'})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
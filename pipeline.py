@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import glob
+import time
+import hashlib
+import fnmatch
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# Incremental pipeline: generate -> classify -> analyze -> report as a dependency graph over files
+# Every node is one ssg.py command with the file patterns it reads and writes (stats CSVs, PNGs, MP4s,
+# PE_Stats_* files, analysis tables and figures). A node depends on the nodes whose outputs match its inputs.
+# A node runs when it has never run, when one of its outputs is missing, or when the content hash of one of its
+# inputs (including its own code) differs from the last successful run; nodes whose inputs are unchanged are
+# skipped even if an upstream node ran again (its outputs came out identical). Independent nodes run in parallel.
+# A failed node blocks everything downstream of it, except the optional ones (warehouse, sequential monitor), whose
+# missing outputs the later steps already handle.
+# Generation and classification call paid APIs and are only run when asked for (--generate / --classify);
+# otherwise their outputs are taken as they are.
+# State (file hashes per node) is kept in StatsResults/pipeline_state.json, logs in StatsResults/pipeline_logs.
+# Run it as: python ssg.py pipeline [targets] [--jobs 4] [--dry-run] [--generate] [--classify]
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join("StatsResults", "pipeline_state.json")
+LOG_DIR = os.path.join("StatsResults", "pipeline_logs")
+PROBLEM_SIZES = ["glitch", "bummer", "disaster"]
+CLASSIFIERS = [("cgpt", "text"), ("cgpt", "image"), ("gemini", "text"), ("gemini", "image"), ("gemini", "video")]
+PE_STATS = "StatsResults/PE_Stats_summary_*_combined_*_classify_*.csv"
+HUMAN_EVAL = "StatsResults/Group Evaluation - combined.csv"
+WAREHOUSE = "StatsResults/warehouse/manifest.json"
+IMAGES = "*Folder/*.png"
+PAID = ("generate", "classify")
+
+
+class Node:
+    """One command with the file patterns it reads and writes"""
+
+    def __init__(self, name: str, command: list, inputs: list, outputs: list, code: list = (),
+                 kind: str = "analyze", optional: bool = False):
+        self.name = name
+        self.command = command
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = list(code)
+        self.kind = kind
+        self.optional = optional  # a failure does not block the downstream nodes
+
+    def __repr__(self):
+        return f"Node({self.name})"
+
+
+def ssg(*args) -> list:
+    return [sys.executable, os.path.join(ROOT, "ssg.py")] + list(args)
+
+
+def analysis(*names) -> list:
+    return [f"Analysis/{name}" for name in names]
+
+
+def build_graph() -> list:
+    nodes = []
+    for p in PROBLEM_SIZES:
+        folder = f"{p.capitalize()}Folder"
+        nodes.append(Node(f"generate:{p}", ssg("generate", "--problem", p), [],
+                          [f"{folder}/Stats_summary_{p}_combined.csv", f"{folder}/*.png", f"{folder}/*.mp4"],
+                          kind="generate"))
+        for model, modality in CLASSIFIERS:
+            media = {"image": [f"{folder}/*.png"], "video": [f"{folder}/*.mp4"]}.get(modality, [])
+            nodes.append(Node(f"classify:{model}:{modality}:{p}",
+                              ssg("classify", "--model", model, "--modality", modality, "--problem", p),
+                              [f"{folder}/Stats_summary_{p}_combined.csv"] + media,
+                              [f"StatsResults/PE_Stats_summary_{p}_combined_{model}_classify_{modality}.csv"],
+                              kind="classify"))
+    nodes += [
+        Node("warehouse", ssg("analyze", "warehouse"), ["*Folder/Stats_summary_*_combined.csv", PE_STATS, HUMAN_EVAL],
+             [WAREHOUSE], analysis("results_warehouse.py"), optional=True),
+        Node("features", ssg("analyze", "features"), [IMAGES], ["StatsResults/image_features.sqlite"],
+             analysis("feature_store.py", "image_features.py")),
+        Node("quant", ssg("analyze", "quant"), ["StatsResults/image_features.sqlite"],
+             ["StatsResults/ImageAnalysis_Stats_Quant.csv", "StatsResults/ImageAnalysis_Bootstrap_Quant.csv"],
+             analysis("Quant_ImageAnalysis.py", "feature_store.py", "image_features.py", "resampling.py")),
+        Node("sequential", ssg("analyze", "sequential"), ["StatsResults/image_features.sqlite"],
+             ["StatsResults/ImageAnalysis_Sequential.csv"], analysis("sequential_monitor.py"), optional=True),
+        Node("metrics", ssg("analyze", "metrics"), [PE_STATS, WAREHOUSE],
+             ["StatsResults/classification_metrics_report.csv", "StatsResults/classification_confusion_matrices.csv"],
+             analysis("classification_metrics.py")),
+        Node("agreement", ssg("analyze", "agreement"), [PE_STATS, WAREHOUSE], ["StatsResults/classification_agreement.csv"],
+             analysis("agreement.py", "classification_metrics.py", "resampling.py")),
+        Node("power", ssg("analyze", "power"), [PE_STATS, WAREHOUSE],
+             ["StatsResults/binomial_analysis_results.csv", "StatsResults/binomial_sample_size_plan.csv"],
+             analysis("Classification power.py", "classification_metrics.py")),
+        Node("human", ssg("analyze", "human"), [HUMAN_EVAL],
+             ["StatsResults/dalle3_vs_gpt4o_test_results.csv", "StatsResults/plot_*_95ci.png", "StatsResults/paired_diff_*_95ci.png"],
+             analysis("HumanEval_Image analysis.py", "resampling.py")),
+        Node("interrater", ssg("analyze", "interrater"), [HUMAN_EVAL],
+             ["StatsResults/icc_alignment.csv", "StatsResults/icc_aesthetics.csv", "StatsResults/interrater_reliability.csv"],
+             analysis("HumanEval_InterRater.py", "reliability.py", "resampling.py")),
+    ]
+    # The report renders from the tables of every analysis node
+    tables = [o for node in nodes if node.kind == "analyze" and node.name != "warehouse" for o in node.outputs if o.endswith(".csv")]
+    nodes.append(Node("report", ssg("report"), tables + [PE_STATS, HUMAN_EVAL, WAREHOUSE],
+                      ["StatsResults/report.html", "StatsResults/report.md", "StatsResults/ConfusionMatrix_*.png",
+                       "StatsResults/binomial_power_curves.png"],
+                      analysis("render_report.py"), kind="report"))
+    return nodes
+
+
+def overlaps(a: str, b: str) -> bool:
+    """Whether two file patterns can name the same file"""
+    return fnmatch.fnmatch(a, b) or fnmatch.fnmatch(b, a)
+
+
+class Pipeline:
+    """Dependency graph of the nodes, with the file hashes of their last successful runs"""
+
+    def __init__(self, nodes: list = None, root: str = None):
+        self.nodes = {node.name: node for node in (nodes or build_graph())}
+        self.root = root or os.getcwd()
+        self.deps = {name: sorted(other.name for other in self.nodes.values() if other.name != name and
+                                  any(overlaps(i, o) for i in node.inputs for o in other.outputs))
+                     for name, node in self.nodes.items()}
+        self.state_path = os.path.join(self.root, STATE_FILE)
+        self.state = {"files": {}, "nodes": {}}
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                self.state = json.load(f)
+        self.lock = threading.Lock()
+
+    def order(self, names: list) -> list:
+        """names and everything upstream of them, dependencies first"""
+        ordered, seen = [], set()
+
+        def visit(name):
+            if name in seen:
+                return
+            seen.add(name)
+            for dep in self.deps[name]:
+                visit(dep)
+            ordered.append(name)
+
+        for name in names:
+            visit(name)
+        return ordered
+
+    def select(self, targets: list = None) -> list:
+        if not targets:
+            return self.order(list(self.nodes))
+        names = [name for name in self.nodes for t in targets if name == t or name.startswith(t + ":")]
+        unknown = [t for t in targets if not any(name == t or name.startswith(t + ":") for name in self.nodes)]
+        if unknown:
+            raise KeyError(f"unknown pipeline node: {', '.join(unknown)}")
+        return self.order(names)
+
+    def resolve(self, patterns: list) -> list:
+        files = set()
+        for pattern in patterns:
+            files.update(os.path.relpath(p, self.root) for p in glob.glob(os.path.join(self.root, pattern)))
+        return sorted(files)
+
+    def file_hash(self, path: str) -> str:
+        """sha256 of a file, cached by size and modification time so unchanged files are not read again"""
+        full = os.path.join(self.root, path)
+        stat = os.stat(full)
+        key = [stat.st_size, stat.st_mtime_ns]
+        with self.lock:
+            cached = self.state["files"].get(path)
+        if cached and cached[:2] == key:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(full, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        with self.lock:
+            self.state["files"][path] = key + [digest.hexdigest()]
+        return digest.hexdigest()
+
+    def hashes(self, patterns: list) -> dict:
+        return {path: self.file_hash(path) for path in self.resolve(patterns)}
+
+    def missing_outputs(self, node: Node) -> list:
+        return [p for p in node.outputs if not glob.glob(os.path.join(self.root, p))]
+
+    def stale_reason(self, node: Node) -> str:
+        """Why the node has to run, or None when it is up to date"""
+        record = self.state["nodes"].get(node.name)
+        missing = self.missing_outputs(node)
+        if missing:
+            return f"missing {missing[0]}"
+        if record is None:
+            # Outputs of the paid steps made before the pipeline existed are taken as the baseline
+            return "never run" if (node.inputs or node.code) and node.kind not in PAID else None
+        inputs = self.hashes(node.inputs + node.code)
+        if record["inputs"] != inputs:
+            changed = sorted(set(record["inputs"].items()) ^ set(inputs.items()))
+            return f"changed {changed[0][0]}"
+        return None
+
+    def record(self, node: Node, seconds: float) -> None:
+        inputs, outputs = self.hashes(node.inputs + node.code), self.hashes(node.outputs)
+        with self.lock:
+            self.state["nodes"][node.name] = {"inputs": inputs, "outputs": outputs, "seconds": round(seconds, 2),
+                                              "finished": time.strftime("%Y-%m-%d %H:%M:%S")}
+            self.save()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp, self.state_path)
+
+    def execute(self, node: Node) -> tuple:
+        """Run one node; returns (success, seconds)"""
+        log_dir = os.path.join(self.root, LOG_DIR)
+        os.makedirs(log_dir, exist_ok=True)
+        start = time.perf_counter()
+        with open(os.path.join(log_dir, node.name.replace(":", "_") + ".log"), "w") as log:
+            done = subprocess.run(node.command, cwd=self.root, stdout=log, stderr=subprocess.STDOUT)
+        seconds = time.perf_counter() - start
+        if done.returncode == 0:
+            self.record(node, seconds)
+        return done.returncode == 0, seconds
+
+    def plan(self, targets: list = None, kinds: set = ("analyze", "report")) -> list:
+        """(name, reason) of the nodes a run would execute; nodes downstream of one that runs are assumed to run"""
+        will_run, planned = set(), []
+        for name in self.select(targets):
+            node = self.nodes[name]
+            if node.kind not in kinds:
+                continue
+            reason = self.stale_reason(node)
+            upstream = [dep for dep in self.deps[name] if dep in will_run]
+            if reason is None and upstream:
+                reason = f"after {upstream[0]}"
+            if reason:
+                will_run.add(name)
+                planned.append((name, reason))
+        return planned
+
+    def run(self, targets: list = None, jobs: int = 4, kinds: set = ("analyze", "report"), log=print) -> dict:
+        """Run the stale nodes in dependency order, up to jobs at a time; returns the outcome of every node"""
+        names = self.select(targets)
+        outcome = {}
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            running = {}
+            while len(outcome) < len(names):
+                for name in names:
+                    if name in outcome or name in running.values():
+                        continue
+                    deps = [dep for dep in self.deps[name] if dep in names]
+                    if any(dep not in outcome for dep in deps):
+                        continue
+                    node = self.nodes[name]
+                    failed = [dep for dep in deps if outcome[dep] in ("failed", "blocked") and not self.nodes[dep].optional]
+                    if failed:
+                        outcome[name] = "blocked"
+                        log(f"  {name}: blocked by {failed[0]}")
+                        continue
+                    reason = self.stale_reason(node)
+                    if reason is None and name not in self.state["nodes"]:
+                        self.record(node, 0.0)
+                    if node.kind not in kinds:
+                        outcome[name] = "external"
+                        if reason and reason.startswith("missing"):
+                            log(f"  {name}: {reason} (run with --{node.kind})")
+                        continue
+                    if reason is None:
+                        outcome[name] = "up to date"
+                        continue
+                    log(f"  {name}: running ({reason})")
+                    running[pool.submit(self.execute, node)] = name
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    success, seconds = future.result()
+                    outcome[name] = "ran" if success else "failed"
+                    log(f"  {name}: {'done' if success else 'FAILED'} in {seconds:.1f} s"
+                        + ("" if success else f", see {os.path.join(LOG_DIR, name.replace(':', '_') + '.log')}"))
+        return outcome
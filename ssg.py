@@ -0,0 +1,303 @@
+import time
+START = time.perf_counter()
+import os
+import re
+import sys
+import csv
+import json
+import argparse
+
+# Single entry point for the social scenario pipeline (run it from the repository root):
+#   python ssg.py generate --problem bummer --n 100         scenario generation (Scenario Generation/)
+#   python ssg.py classify --model gemini --modality video --problem glitch
+#   python ssg.py analyze [metrics agreement power ...]     analysis scripts (Analysis/), headless by default
+#   python ssg.py report [--workers 4] [--list]             render every figure + StatsResults/report.html
+#   python ssg.py status                                    what has been generated, classified and rendered
+#   python ssg.py startup                                   measure and record the start-up time of every subcommand
+#   python ssg.py pipeline [targets] [--jobs 4] [--dry-run]   rerun only what is stale, in parallel (pipeline.py)
+# Arguments are parsed with the standard library only; moviepy, openai, sklearn, pingouin, cv2, matplotlib ...
+# are imported inside the subcommand that needs them, so status and report --list return immediately.
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PROBLEM_SIZES = ["glitch", "bummer", "disaster"]
+GENERATOR = ("Scenario Generation", "Generate_Scenario_text_image_video_PE")
+CLASSIFIERS = {
+    ("cgpt", "text"): "Cgpt_classify_text",
+    ("cgpt", "image"): "Cgpt_classify_image",
+    ("gemini", "text"): "Gemini_classify_text",
+    ("gemini", "image"): "Gemini_classify_image",
+    ("gemini", "video"): "Gemini_classify_video",
+}
+ANALYSES = {
+    "metrics": "classification_metrics",
+    "agreement": "agreement",
+    "kappa": "GPTvsGemini Classification Agreement",
+    "power": "Classification power",
+    "human": "HumanEval_Image analysis",
+    "interrater": "HumanEval_InterRater",
+    "quant": "Quant_ImageAnalysis",
+    "sequential": "sequential_monitor",
+    "features": "feature_store",
+    "pack": "image_pack",
+    "warehouse": "results_warehouse",
+}
+DEFAULT_ANALYSES = ["metrics", "agreement", "power", "human", "interrater"]
+STARTUP_FILE = "cli_startup.csv"
+STARTUP_COMMANDS = [
+    ["status"],
+    ["report", "--list"],
+    ["report"],
+    ["analyze", "metrics"],
+    ["classify", "--model", "cgpt", "--modality", "text"],
+    ["classify", "--model", "gemini", "--modality", "video"],
+    ["generate"],
+    ["pipeline", "--dry-run"],
+]
+
+
+def stats_dir() -> str:
+    return os.path.join(os.getcwd(), "StatsResults")
+
+
+def startup_done(args) -> bool:
+    """Report the start-up time; True when the command should stop here (--startup-only)"""
+    if args.startup_only:
+        print(f"startup {time.perf_counter() - START:.3f} s")
+    return args.startup_only
+
+
+def load_module(folder: str, name: str):
+    """Import a pipeline script by file name, with its folder on sys.path for its own imports"""
+    import importlib.util
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    spec = importlib.util.spec_from_file_location(name.replace(" ", "_"), os.path.join(path, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def csv_rows(path: str) -> int:
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+
+def cmd_generate(args) -> int:
+    generator = load_module(*GENERATOR)
+    if startup_done(args):
+        return 0
+    for problem in args.problem:
+        generator.main(problem, args.n)
+    return 0
+
+
+def cmd_classify(args) -> int:
+    name = CLASSIFIERS.get((args.model, args.modality))
+    if name is None:
+        print(f"No {args.model} classifier for {args.modality}; available: "
+              + ", ".join(f"{m}/{d}" for m, d in CLASSIFIERS))
+        return 2
+    classifier = load_module("Classify", name)
+    if startup_done(args):
+        return 0
+    for problem in args.problem:
+        classifier.main(problem)
+        # The classifiers write to the working directory; the analysis reads StatsResults
+        output = f"PE_Stats_summary_{problem}_combined_{args.model}_classify_{args.modality}.csv"
+        if os.path.exists(output):
+            os.makedirs(stats_dir(), exist_ok=True)
+            os.replace(output, os.path.join(stats_dir(), output))
+    return 0
+
+
+def cmd_analyze(args) -> int:
+    import runpy
+    if not args.show:
+        os.environ.setdefault("MPLBACKEND", "Agg")  # plt.show() returns immediately, figures go to report
+    names = args.names or DEFAULT_ANALYSES
+    unknown = [name for name in names if name not in ANALYSES]
+    if unknown:
+        print(f"Unknown analysis: {', '.join(unknown)}; available: {', '.join(ANALYSES)}")
+        return 2
+    if startup_done(args):
+        return 0
+    analysis_dir = os.path.join(ROOT, "Analysis")
+    if analysis_dir not in sys.path:
+        sys.path.insert(0, analysis_dir)
+    for name in names:
+        start = time.perf_counter()
+        print(f"== {name} ({ANALYSES[name]}.py)")
+        runpy.run_path(os.path.join(analysis_dir, f"{ANALYSES[name]}.py"), run_name="__main__")
+        print(f"== {name} done in {time.perf_counter() - start:.1f} s")
+    return 0
+
+
+def report_figures(index: str) -> list:
+    with open(index, encoding="utf-8") as f:
+        return re.findall(r"!\[.*?\]\(<(.+?)>\)", f.read())
+
+
+def cmd_report(args) -> int:
+    index = os.path.join(stats_dir(), "report.md")
+    if args.list:
+        if startup_done(args):
+            return 0
+        if not os.path.exists(index):
+            print("No report yet; run: python ssg.py report")
+            return 1
+        for name in report_figures(index):
+            state = "" if os.path.exists(os.path.join(stats_dir(), name)) else "  (missing)"
+            print(f"{name}{state}")
+        print(f"Index: {index}")
+        return 0
+    render_report = load_module("Analysis", "render_report")
+    if startup_done(args):
+        return 0
+    figures = render_report.render_report(stats_dir(), args.workers)
+    print(f"Rendered {len(figures)} figures; index: {os.path.join(stats_dir(), 'report.html')}")
+    return 0
+
+
+def cmd_status(args) -> int:
+    if startup_done(args):
+        return 0
+    root = os.getcwd()
+    print("Generated (stats rows / images / videos):")
+    for problem in PROBLEM_SIZES:
+        folder = os.path.join(root, f"{problem.capitalize()}Folder")
+        stats = os.path.join(folder, f"Stats_summary_{problem}_combined.csv")
+        files = os.listdir(folder) if os.path.isdir(folder) else []
+        rows = csv_rows(stats) if os.path.exists(stats) else 0
+        images = sum(name.endswith(".png") for name in files)
+        videos = sum(name.endswith(".mp4") for name in files)
+        print(f"  {problem:9s} {rows:4d} / {images:4d} / {videos:4d}")
+    print("Classified (rows per problem size):")
+    for model, modality in CLASSIFIERS:
+        counts = []
+        for problem in PROBLEM_SIZES:
+            path = os.path.join(stats_dir(), f"PE_Stats_summary_{problem}_combined_{model}_classify_{modality}.csv")
+            counts.append(f"{problem} {csv_rows(path) if os.path.exists(path) else '-'}")
+        print(f"  {model:6s} {modality:5s}  " + ", ".join(counts))
+    manifest = os.path.join(stats_dir(), "warehouse", "manifest.json")
+    if os.path.exists(manifest):
+        with open(manifest) as f:
+            tables = json.load(f)
+        print("Warehouse: " + ", ".join(f"{name} {entry['rows']} rows" for name, entry in tables.items()))
+    index = os.path.join(stats_dir(), "report.md")
+    if os.path.exists(index):
+        print(f"Report: {len(report_figures(index))} figures, {time.strftime('%Y-%m-%d %H:%M', time.localtime(os.path.getmtime(index)))}")
+    return 0
+
+
+def cmd_startup(args) -> int:
+    """Start-up time of every subcommand in a fresh interpreter, appended to StatsResults/cli_startup.csv"""
+    import subprocess
+    path = os.path.join(stats_dir(), STARTUP_FILE)
+    previous = {}
+    if os.path.exists(path):
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                previous[row["command"]] = row["seconds"]
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    rows = []
+    for command in STARTUP_COMMANDS:
+        start = time.perf_counter()
+        done = subprocess.run([sys.executable, os.path.abspath(__file__), "--startup-only"] + command,
+                              capture_output=True, text=True)
+        seconds = time.perf_counter() - start
+        name = " ".join(command)
+        if done.returncode == 0:
+            status = "ok"
+        else:
+            # Missing optional dependencies are reported, not fatal
+            lines = (done.stderr or done.stdout).strip().splitlines()
+            status = lines[-1] if lines else f"exit {done.returncode}"
+        rows.append({"timestamp": stamp, "command": name, "seconds": f"{seconds:.3f}", "status": status})
+        before = f"(was {previous[name]} s)" if name in previous else ""
+        print(f"  {name:45s} {seconds:6.3f} s {before:16s} {'' if status == 'ok' else status}")
+    os.makedirs(stats_dir(), exist_ok=True)
+    new_file = not os.path.exists(path)
+    with open(path, "a", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["timestamp", "command", "seconds", "status"])
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+    print(f"Recorded in: {path}")
+    return 0
+
+
+def cmd_pipeline(args) -> int:
+    sys.path.insert(0, ROOT)
+    from pipeline import Pipeline
+    if startup_done(args):
+        return 0
+    pipeline = Pipeline()
+    kinds = {"analyze", "report"} | ({"generate"} if args.generate else set()) | ({"classify"} if args.classify else set())
+    try:
+        if args.dry_run:
+            planned = pipeline.plan(args.targets, kinds)
+            for name, reason in planned:
+                print(f"  {name}: {reason}")
+            print(f"{len(planned)} of {len(pipeline.select(args.targets))} nodes would run")
+            return 0
+        start = time.perf_counter()
+        outcome = pipeline.run(args.targets, args.jobs, kinds)
+    except KeyError as e:
+        print(e.args[0])
+        return 2
+    counts = {state: sum(v == state for v in outcome.values()) for state in sorted(set(outcome.values()))}
+    print(", ".join(f"{n} {state}" for state, n in counts.items()) + f" in {time.perf_counter() - start:.1f} s")
+    return 1 if counts.get("failed") or counts.get("blocked") else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="ssg", description="Social scenario generation pipeline")
+    parser.add_argument("--startup-only", action="store_true",
+                        help="import what the subcommand needs, print the start-up time and exit")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("generate", help="generate scenarios (text, images, voice, video)")
+    p.add_argument("--problem", nargs="+", choices=PROBLEM_SIZES, default=["bummer"])
+    p.add_argument("--n", type=int, default=100, help="scenarios per problem size")
+    p.set_defaults(func=cmd_generate)
+
+    p = sub.add_parser("classify", help="classify the problem size of generated scenarios")
+    p.add_argument("--model", choices=sorted({m for m, _ in CLASSIFIERS}), required=True)
+    p.add_argument("--modality", choices=["text", "image", "video"], required=True)
+    p.add_argument("--problem", nargs="+", choices=PROBLEM_SIZES, default=PROBLEM_SIZES)
+    p.set_defaults(func=cmd_classify)
+
+    p = sub.add_parser("analyze", help="run analysis scripts (default: " + " ".join(DEFAULT_ANALYSES) + ")")
+    p.add_argument("names", nargs="*", metavar="analysis", help=", ".join(ANALYSES))
+    p.add_argument("--show", action="store_true", help="show figures in windows instead of running headless")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser("report", help="render every figure headless and write StatsResults/report.html")
+    p.add_argument("--workers", type=int, default=1, help="processes rendering figures")
+    p.add_argument("--list", action="store_true", help="list the figures of the last report without rendering")
+    p.set_defaults(func=cmd_report)
+
+    p = sub.add_parser("status", help="what has been generated, classified and rendered")
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("pipeline", help="rerun the stale steps in dependency order, independent steps in parallel")
+    p.add_argument("targets", nargs="*", help="node names or prefixes (e.g. report, metrics, classify:gemini); default all")
+    p.add_argument("--jobs", type=int, default=4, help="nodes running at the same time")
+    p.add_argument("--dry-run", action="store_true", help="only list what would run and why")
+    p.add_argument("--generate", action="store_true", help="also run stale generation (paid API calls)")
+    p.add_argument("--classify", action="store_true", help="also run stale classification (paid API calls)")
+    p.set_defaults(func=cmd_pipeline)
+
+    p = sub.add_parser("startup", help="measure and record the start-up time of every subcommand")
+    p.set_defaults(func=cmd_startup)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())